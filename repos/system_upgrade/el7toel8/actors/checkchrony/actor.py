@@ -1,7 +1,7 @@
 from leapp.actors import Actor
 from leapp.libraries.actor.library import check_chrony
 from leapp.libraries.common.rpms import has_package
-from leapp.models import InstalledRedHatSignedRPM
+from leapp.models import InstalledRedHatSignedRPM, ModifiedConfigFiles
 from leapp.reporting import Report
 from leapp.tags import ChecksPhaseTag, IPUWorkflowTag
 
@@ -15,7 +15,7 @@ class CheckChrony(Actor):
     """
 
     name = 'check_chrony'
-    consumes = (InstalledRedHatSignedRPM,)
+    consumes = (InstalledRedHatSignedRPM, ModifiedConfigFiles)
     produces = (Report,)
     tags = (ChecksPhaseTag, IPUWorkflowTag)
 
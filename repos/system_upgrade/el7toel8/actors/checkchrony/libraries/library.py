@@ -1,5 +1,6 @@
 from leapp import reporting
-from leapp.libraries.stdlib import api, run
+from leapp.libraries.stdlib import api
+from leapp.models import ModifiedConfigFiles
 
 
 related = [
@@ -11,12 +12,11 @@ related = [
 
 def is_config_default():
     """Check if the chrony config file was not modified since installation."""
-    try:
-        result = run(['rpm', '-V', '--nomtime', 'chrony'], checked=False)
-        return '/etc/chrony.conf' not in result['stdout']
-    except OSError as e:
-        api.current_logger().warn("rpm verification failed: %s", str(e))
+    modified = next(api.consume(ModifiedConfigFiles), None)
+    if modified is None:
+        api.current_logger().warn('Modified configuration files are not known')
         return True
+    return '/etc/chrony.conf' not in {f.path for f in modified.files}
 
 
 def check_chrony(chrony_installed):
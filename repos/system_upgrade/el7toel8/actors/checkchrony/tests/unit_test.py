@@ -1,6 +1,8 @@
 from leapp.libraries.actor import library
 from leapp.libraries.common.testutils import create_report_mocked
 from leapp import reporting
+from leapp.libraries.stdlib import api
+from leapp.models import ModifiedConfigFile, ModifiedConfigFiles
 
 
 def test_uninstalled(monkeypatch):
@@ -31,3 +33,40 @@ def test_installed_nodefconf(monkeypatch):
 
     assert reporting.create_report.called == 1
     assert reporting.create_report.report_fields['title'] == 'chrony using non-default configuration'
+
+
+class logger_mocked(object):
+    def __init__(self):
+        self.warnmsg = []
+
+    def __call__(self):
+        return self
+
+    def warn(self, *args):
+        self.warnmsg.extend(args)
+
+
+def _consume_modified(monkeypatch, messages):
+    monkeypatch.setattr(api, 'consume', lambda model: iter(messages))
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+
+
+def test_is_config_default_modified(monkeypatch):
+    _consume_modified(monkeypatch, [ModifiedConfigFiles(
+        files=[ModifiedConfigFile(path='/etc/chrony.conf', flags='S.5......')])])
+
+    assert not library.is_config_default()
+
+
+def test_is_config_default_not_modified(monkeypatch):
+    _consume_modified(monkeypatch, [ModifiedConfigFiles(
+        files=[ModifiedConfigFile(path='/etc/other.conf', flags='S.5......')])])
+
+    assert library.is_config_default()
+
+
+def test_is_config_default_unknown(monkeypatch):
+    _consume_modified(monkeypatch, [])
+
+    assert library.is_config_default()
+    assert api.current_logger.warnmsg
@@ -0,0 +1,32 @@
+import re
+
+from leapp.libraries.common.rpms import get_installed_rpm_items
+from leapp.libraries.stdlib import api
+from leapp.models import InstalledUnsignedRPM, LeftoverPackages
+
+LEAPP_PACKAGES = ('leapp', 'leapp-repository', 'snactor', 'leapp-repository-deps-el8', 'leapp-deps-el8',
+                  'python2-leapp', 'leapp-repository-sos-plugin')
+# e.g. '957.el7' or '1.el7_6.1'
+DIST_TAG_RE = re.compile(r'\.el(\d+)')
+
+
+def get_dist_tag_major(release):
+    """ Return major version of the distribution the package has been built for, e.g. 7 for '1.el7_6.1' """
+    match = DIST_TAG_RE.search(release)
+    return int(match.group(1)) if match else None
+
+
+def get_leftover_packages(installed_rpms, excluded_names):
+    """ Return el7 packages out of the installed packages, except those with the excluded names """
+    return [pkg for pkg in installed_rpms
+            if pkg.name not in excluded_names and get_dist_tag_major(pkg.release) == 7]
+
+
+def process():
+    installed_rpms = get_installed_rpm_items()
+    if not installed_rpms:
+        return
+
+    unsigned = next(api.consume(InstalledUnsignedRPM), InstalledUnsignedRPM())
+    excluded_names = {pkg.name for pkg in unsigned.items}.union(LEAPP_PACKAGES)
+    api.produce(LeftoverPackages(items=get_leftover_packages(installed_rpms, excluded_names)))
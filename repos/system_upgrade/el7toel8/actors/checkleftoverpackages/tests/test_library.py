@@ -0,0 +1,25 @@
+from leapp.libraries.actor import library
+from leapp.models import RPM
+
+RH_PACKAGER = 'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>'
+
+
+def _rpm(name, release):
+    return RPM(name=name, version='0.1', release=release, epoch='0', packager=RH_PACKAGER, arch='noarch',
+               pgpsig='SOME_SIG')
+
+
+def test_get_dist_tag_major():
+    assert library.get_dist_tag_major('957.el7') == 7
+    assert library.get_dist_tag_major('1.el7_6.1') == 7
+    assert library.get_dist_tag_major('80.el8') == 8
+    assert library.get_dist_tag_major('1.fc30') is None
+
+
+def test_get_leftover_packages():
+    installed = [_rpm('bash', '31.el7'), _rpm('kernel', '80.el8'), _rpm('leapp', '1.el7'), _rpm('custom', '1.el7'),
+                 _rpm('python-libs', '80.el7_6'), _rpm('no-dist-tag', '1')]
+
+    leftovers = library.get_leftover_packages(installed, {'custom'}.union(library.LEAPP_PACKAGES))
+
+    assert [pkg.name for pkg in leftovers] == ['bash', 'python-libs']
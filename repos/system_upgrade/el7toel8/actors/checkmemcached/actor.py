@@ -1,7 +1,7 @@
 from leapp.actors import Actor
 from leapp.libraries.actor.library import check_memcached
 from leapp.libraries.common.rpms import has_package
-from leapp.models import InstalledRedHatSignedRPM
+from leapp.models import InstalledRedHatSignedRPM, ModifiedConfigFiles
 from leapp.reporting import Report
 from leapp.tags import ChecksPhaseTag, IPUWorkflowTag
 
@@ -16,7 +16,7 @@ class CheckMemcached(Actor):
     """
 
     name = 'check_memcached'
-    consumes = (InstalledRedHatSignedRPM,)
+    consumes = (InstalledRedHatSignedRPM, ModifiedConfigFiles)
     produces = (Report,)
     tags = (ChecksPhaseTag, IPUWorkflowTag)
 
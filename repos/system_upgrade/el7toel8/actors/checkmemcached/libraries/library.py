@@ -1,7 +1,8 @@
 import re
 
 from leapp import reporting
-from leapp.libraries.stdlib import api, run
+from leapp.libraries.stdlib import api
+from leapp.models import ModifiedConfigFiles
 
 
 COMMON_REPORT_TAGS = [reporting.Tags.SERVICES]
@@ -17,12 +18,11 @@ related = [
 
 def is_sysconfig_default():
     """Check if the memcached sysconfig file was not modified since installation."""
-    try:
-        result = run(['rpm', '-V', '--nomtime', 'memcached'], checked=False)
-        return sysconfig_path not in result['stdout']
-    except OSError as e:
-        api.current_logger().warn("rpm verification failed: %s", str(e))
+    modified = next(api.consume(ModifiedConfigFiles), None)
+    if modified is None:
+        api.current_logger().warn('Modified configuration files are not known')
         return True
+    return sysconfig_path not in {f.path for f in modified.files}
 
 
 def is_udp_disabled():
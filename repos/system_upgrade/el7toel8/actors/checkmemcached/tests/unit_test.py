@@ -1,6 +1,8 @@
 from leapp.libraries.actor import library
 from leapp import reporting
 from leapp.libraries.common.testutils import create_report_mocked
+from leapp.libraries.stdlib import api
+from leapp.models import ModifiedConfigFile, ModifiedConfigFiles
 
 
 def test_uninstalled(monkeypatch):
@@ -47,3 +49,40 @@ def test_installed_nodefconf_noudp(monkeypatch):
 
     assert reporting.create_report.called == 1
     assert reporting.create_report.report_fields['title'] == 'memcached has already disabled UDP port'
+
+
+class logger_mocked(object):
+    def __init__(self):
+        self.warnmsg = []
+
+    def __call__(self):
+        return self
+
+    def warn(self, *args):
+        self.warnmsg.extend(args)
+
+
+def _consume_modified(monkeypatch, messages):
+    monkeypatch.setattr(api, 'consume', lambda model: iter(messages))
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+
+
+def test_is_sysconfig_default_modified(monkeypatch):
+    _consume_modified(monkeypatch, [ModifiedConfigFiles(
+        files=[ModifiedConfigFile(path='/etc/sysconfig/memcached', flags='S.5......')])])
+
+    assert not library.is_sysconfig_default()
+
+
+def test_is_sysconfig_default_not_modified(monkeypatch):
+    _consume_modified(monkeypatch, [ModifiedConfigFiles(
+        files=[ModifiedConfigFile(path='/etc/other.conf', flags='S.5......')])])
+
+    assert library.is_sysconfig_default()
+
+
+def test_is_sysconfig_default_unknown(monkeypatch):
+    _consume_modified(monkeypatch, [])
+
+    assert library.is_sysconfig_default()
+    assert api.current_logger.warnmsg
@@ -1,4 +1,5 @@
 from leapp.actors import Actor
+from leapp.libraries.common.storagetree import StorageTree
 from leapp.models import StorageInfo
 from leapp.reporting import Report, create_report
 from leapp import reporting
@@ -31,11 +32,9 @@ class CheckNfs(Actor):
                     break
 
             # Check mount
-            for mount in storage.mount:
-                if mount.tp == "nfs":
-                    nfs_found = True
-                    details += "- Currently mounted NFS shares\n"
-                    break
+            if StorageTree(storage).get_mounts(fs_types=("nfs",)):
+                nfs_found = True
+                details += "- Currently mounted NFS shares\n"
 
             # Check systemd-mount
             for systemdmount in storage.systemdmount:
@@ -7,7 +7,7 @@ stage() {
 }
 
 get_kernel_version() {
-    rpm -qa | grep kernel-modules | cut -d- -f3- | sort | tail -n 1
+    rpm -q kernel-modules --queryformat '%{VERSION}-%{RELEASE}.%{ARCH}\n' | sort -V | tail -n 1
 }
 
 dracut_install_modules()
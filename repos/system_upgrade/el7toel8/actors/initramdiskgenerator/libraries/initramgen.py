@@ -2,10 +2,10 @@ import os
 import shutil
 
 from leapp.exceptions import StopActorExecutionError
-from leapp.libraries.common import dnfplugin, mounting
+from leapp.libraries.common import dnfplugin, mounting, rpms
 from leapp.libraries.common.config import architecture
-from leapp.libraries.stdlib import api
-from leapp.models import (BootContent, RequiredUpgradeInitramPackages, TargetUserSpaceInfo, UpgradeDracutModule,
+from leapp.libraries.stdlib import api, CalledProcessError
+from leapp.models import (BootContent, RequiredUpgradeInitramPackages, RPM, TargetUserSpaceInfo, UpgradeDracutModule,
                           UsedTargetRepositories)
 
 INITRAM_GEN_SCRIPT_NAME = 'generate-initram.sh'
@@ -88,6 +88,27 @@ def install_multipath_files(context):
             context.copytree_to('/etc/multipath', '/etc/multipath')
 
 
+def get_kernel_version(context):
+    """
+    Return version of the newest kernel installed in the `context` userspace, e.g. '4.18.0-80.el8.x86_64'
+    """
+    cmd = ['rpm', '-q', 'kernel-modules', '--queryformat', r'%{NAME}|%{EPOCH}|%{VERSION}|%{RELEASE}|%{ARCH}\n']
+    try:
+        output = context.call(cmd, split=True)['stdout']
+    except CalledProcessError:
+        # leave it up to the generator script
+        return ''
+    kernels = []
+    for line in output:
+        name, epoch, version, release, arch = line.strip().split('|')
+        kernels.append(RPM(name=name, epoch=epoch, version=version, release=release, arch=arch, packager='',
+                           pgpsig=''))
+    if not kernels:
+        return ''
+    newest = rpms.sort_packages(kernels)[-1]
+    return '{}-{}.{}'.format(newest.version, newest.release, newest.arch)
+
+
 def generate_initram_disk(context):
     """
     Function to actually execute the initram creation.
@@ -107,10 +128,11 @@ def generate_initram_disk(context):
     # FIXME: issue #376
     context.call([
         '/bin/sh', '-c',
-        'LEAPP_ADD_DRACUT_MODULES="{modules}" LEAPP_KERNEL_ARCH={arch} '
+        'LEAPP_ADD_DRACUT_MODULES="{modules}" LEAPP_KERNEL_ARCH={arch} LEAPP_KERNEL_VERSION="{kernel}" '
         'LEAPP_DRACUT_INSTALL_FILES="{files}" {cmd}'.format(
             modules=','.join([mod.name for mod in modules]),
             arch=api.current_actor().configuration.architecture,
+            kernel=get_kernel_version(context),
             files=' '.join(install_files),
             cmd=os.path.join('/', INITRAM_GEN_SCRIPT_NAME))
     ])
@@ -0,0 +1,28 @@
+from leapp.libraries.actor import initramgen
+from leapp.libraries.stdlib import CalledProcessError
+
+
+class MockedContext(object):
+    def __init__(self, stdout=None):
+        self.stdout = stdout
+        self.called = []
+
+    def call(self, cmd, **kwargs):
+        self.called.append(cmd)
+        if self.stdout is None:
+            raise CalledProcessError('package kernel-modules is not installed', cmd, {'exit_code': 1})
+        return {'stdout': self.stdout}
+
+
+def test_get_kernel_version():
+    context = MockedContext([
+        'kernel-modules|(none)|4.18.0|147.el8|x86_64',
+        'kernel-modules|(none)|4.18.0|80.el8|x86_64',
+        'kernel-modules|(none)|4.18.0|80.11.2.el8_0|x86_64',
+    ])
+    assert initramgen.get_kernel_version(context) == '4.18.0-147.el8.x86_64'
+    assert context.called[0][:3] == ['rpm', '-q', 'kernel-modules']
+
+
+def test_get_kernel_version_not_installed():
+    assert initramgen.get_kernel_version(MockedContext()) == ''
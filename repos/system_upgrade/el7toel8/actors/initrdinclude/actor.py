@@ -1,6 +1,6 @@
 
 from leapp.actors import Actor
-from leapp.models import InitrdIncludes
+from leapp.models import InitrdIncludes, InstalledTargetKernelVersion
 from leapp.tags import IPUWorkflowTag, FinalizationPhaseTag
 from leapp.libraries.stdlib import run, CalledProcessError
 from leapp.exceptions import StopActorExecutionError
@@ -12,19 +12,15 @@ class InitrdInclude(Actor):
     """
 
     name = 'initrdinclude'
-    consumes = (InitrdIncludes, )
+    consumes = (InitrdIncludes, InstalledTargetKernelVersion)
     produces = ()
     tags = (FinalizationPhaseTag, IPUWorkflowTag)
 
     def get_rhel8_kernel_version(self):
-        kernels = run(["rpm", "-q", "kernel"], split=True)["stdout"]
-        for kernel in kernels:
-            version = kernel.split("-", 1)[1]
-            if "el8" in version:
-                return version
-        raise StopActorExecutionError(
-            "Cannot get version of the installed RHEL-8 kernel",
-            details={"details": "\n".join(kernels)})
+        target_kernel = next(self.consume(InstalledTargetKernelVersion), None)
+        if not target_kernel:
+            raise StopActorExecutionError("Cannot get version of the installed RHEL-8 kernel")
+        return target_kernel.version
 
     def process(self):
         files = []
@@ -36,22 +32,12 @@ class InitrdInclude(Actor):
             self.log.debug("No additional files required to add into the initrd.")
             return
 
-        # TODO(pstodulk): consume message that provides info about currently
-        # # installed rpms; - it doesn't exist yet
-        try:
-            kernel_version = self.get_rhel8_kernel_version()
-            self.log.debug("The detected RHEL 8 kernel: {}".format(kernel_version))
-        except CalledProcessError as e:
-            # just hypothetic check, it should not die
-            # NOTE(pstodulk): raise an exception and stop leapp execution now?
-            raise StopActorExecutionError(
-                "Cannot get info about the installed kernel.",
-                details={"details": str(e)})
+        kernel_version = self.get_rhel8_kernel_version()
+        self.log.debug("The detected RHEL 8 kernel: {}".format(kernel_version))
         try:
             cmd = ["dracut", "--install", " ".join(files), "-f", "--kver", kernel_version]
             run(cmd)
         except CalledProcessError as e:
-            # NOTE(pstodulk) same note as above
             raise StopActorExecutionError(
                 "Cannot regenerate dracut image.",
                 details={"details": str(e)})
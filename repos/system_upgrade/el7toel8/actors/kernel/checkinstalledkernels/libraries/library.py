@@ -1,13 +1,13 @@
 from leapp import reporting
 from leapp.exceptions import StopActorExecutionError
 from leapp.libraries.common.config import architecture
+from leapp.libraries.common.rpms import get_installed_package_index
 from leapp.libraries.stdlib import api
 from leapp.models import InstalledRedHatSignedRPM
 
 
 def _get_kernel_rpms():
-    rpms = next(api.consume(InstalledRedHatSignedRPM), InstalledRedHatSignedRPM())
-    return [pkg for pkg in rpms.items if pkg.name == 'kernel']
+    return get_installed_package_index(InstalledRedHatSignedRPM).get_packages('kernel')
 
 
 def process():
@@ -0,0 +1,21 @@
+from leapp.actors import Actor
+from leapp.libraries.actor import library
+from leapp.models import InstalledRPM, ModifiedConfigFiles
+from leapp.tags import FactsPhaseTag, IPUWorkflowTag
+
+
+class ModifiedConfigFilesScanner(Actor):
+    """
+    Find out which configuration files of selected packages were modified since installation.
+
+    The installed packages other actors are interested in are verified by a single rpm --verify call,
+    so the actors do not need to verify the packages on their own.
+    """
+
+    name = 'modified_config_files_scanner'
+    consumes = (InstalledRPM,)
+    produces = (ModifiedConfigFiles,)
+    tags = (FactsPhaseTag, IPUWorkflowTag)
+
+    def process(self):
+        library.process()
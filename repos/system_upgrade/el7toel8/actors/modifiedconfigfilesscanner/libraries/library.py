@@ -0,0 +1,40 @@
+import re
+
+from leapp.libraries.common.rpms import get_installed_package_index
+from leapp.libraries.stdlib import api, run
+from leapp.models import InstalledRPM, ModifiedConfigFile, ModifiedConfigFiles
+
+# Packages with configuration files checked by other actors
+VERIFIED_PACKAGES = (
+    'chrony',
+    'memcached',
+    'openssh-server',
+)
+
+# e.g. 'S.5....T.  c /etc/ssh/sshd_config' or 'missing   c /etc/foo.conf'
+VERIFY_LINE_RE = re.compile(r'^(?P<flags>\S+)\s+c\s(?P<path>/.*)$')
+
+
+def parse_verify_output(lines):
+    """ Get modified configuration files out of the rpm --verify output """
+    files = []
+    for line in lines:
+        match = VERIFY_LINE_RE.match(line.rstrip('\n'))
+        if match:
+            files.append(ModifiedConfigFile(path=match.group('path'), flags=match.group('flags')))
+    return files
+
+
+def process():
+    installed = get_installed_package_index(InstalledRPM)
+    packages = [pkg for pkg in VERIFIED_PACKAGES if installed.has_package(pkg)]
+    files = []
+    if packages:
+        try:
+            # rpm returns non-zero exit code when any file does not pass the verification
+            result = run(['rpm', '--verify', '--configfiles', '--nomtime'] + packages, split=True, checked=False)
+        except OSError as e:
+            api.current_logger().warning('rpm verification failed: {}'.format(e))
+            return
+        files = parse_verify_output(result['stdout'])
+    api.produce(ModifiedConfigFiles(packages=packages, files=files))
@@ -0,0 +1,56 @@
+from leapp.libraries.actor import library
+from leapp.libraries.common.testutils import produce_mocked
+from leapp.libraries.stdlib import api
+from leapp.models import InstalledRPM, RPM
+
+RH_PACKAGER = 'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>'
+VERIFY_OUTPUT = [
+    'S.5......  c /etc/chrony.conf',
+    'missing   c /etc/sysconfig/memcached',
+    '..?......  c /etc/ssh/sshd_config',
+    'S.5......    /usr/bin/not-a-config-file',
+]
+
+
+def _rpm(name):
+    return RPM(name=name, version='0.1', release='1.el7', epoch='0', packager=RH_PACKAGER, arch='x86_64',
+               pgpsig='SOME_SIG')
+
+
+def test_parse_verify_output():
+    files = library.parse_verify_output(VERIFY_OUTPUT)
+
+    assert [(f.path, f.flags) for f in files] == [
+        ('/etc/chrony.conf', 'S.5......'),
+        ('/etc/sysconfig/memcached', 'missing'),
+        ('/etc/ssh/sshd_config', '..?......'),
+    ]
+
+
+def test_process_verifies_installed_packages_at_once(monkeypatch):
+    commands = []
+
+    def run_mocked(cmd, **kwargs):
+        commands.append(cmd)
+        return {'stdout': VERIFY_OUTPUT[:1]}
+
+    installed = InstalledRPM(items=[_rpm('chrony'), _rpm('bash'), _rpm('openssh-server')])
+    monkeypatch.setattr(api, 'consume', lambda model: iter([installed]))
+    monkeypatch.setattr(api, 'produce', produce_mocked())
+    monkeypatch.setattr(library, 'run', run_mocked)
+    library.process()
+
+    assert commands == [['rpm', '--verify', '--configfiles', '--nomtime', 'chrony', 'openssh-server']]
+    message = api.produce.model_instances[0]
+    assert message.packages == ['chrony', 'openssh-server']
+    assert [f.path for f in message.files] == ['/etc/chrony.conf']
+
+
+def test_process_nothing_to_verify(monkeypatch):
+    monkeypatch.setattr(api, 'consume', lambda model: iter([InstalledRPM(items=[_rpm('bash')])]))
+    monkeypatch.setattr(api, 'produce', produce_mocked())
+    monkeypatch.setattr(library, 'run', None)
+    library.process()
+
+    assert api.produce.model_instances[0].packages == []
+    assert api.produce.model_instances[0].files == []
@@ -1,6 +1,6 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import readopensshconfig
-from leapp.models import OpenSshConfig
+from leapp.models import ModifiedConfigFiles, OpenSshConfig
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
 
 
@@ -19,7 +19,7 @@ class OpenSshConfigScanner(Actor):
     """
 
     name = 'read_openssh_config'
-    consumes = ()
+    consumes = (ModifiedConfigFiles, )
     produces = (OpenSshConfig, )
     tags = (FactsPhaseTag, IPUWorkflowTag, )
 
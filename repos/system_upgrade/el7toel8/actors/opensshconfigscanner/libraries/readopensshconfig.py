@@ -1,7 +1,7 @@
 import errno
 
-from leapp.models import OpenSshConfig, OpenSshPermitRootLogin
-from leapp.libraries.stdlib import run, api
+from leapp.models import ModifiedConfigFiles, OpenSshConfig, OpenSshPermitRootLogin
+from leapp.libraries.stdlib import api
 
 
 CONFIG = '/etc/ssh/sshd_config'
@@ -84,26 +84,23 @@ def read_sshd_config():
 def read_rpm_modifications():
     """Asks RPM database whether the configuration file was modified."""
 
-    try:
-        return run(['rpm', '-Vf', CONFIG], split=True, checked=False)['stdout']
-    except OSError as err:
-        error = 'Failed to check the modification status of the {}: {}' \
-                ''.format(CONFIG, str(err))
+    modified = next(api.consume(ModifiedConfigFiles), None)
+    if modified is None:
+        error = 'Failed to check the modification status of the {}'.format(CONFIG)
         api.current_logger().error(error)
         return []
+    return modified.files
 
 
-def parse_config_modification(data):
-    """Handle the output of rpm verify to figure out configuration file was modified."""
+def parse_config_modification(files):
+    """Handle the modified configuration files to figure out configuration file was modified."""
 
-    # First assume it is not modified -- empty data says it is not modified
+    # First assume it is not modified -- no files says it is not modified
     modified = False
-    for line in data:
-        parts = line.split(' ')
-        # The last part of the line is the actual file we care for
-        if parts[-1] == CONFIG:
-            # First part contains information, if the size and digest differ
-            if '5' in parts[0] or 'S' in parts[0]:
+    for modified_file in files:
+        if modified_file.path == CONFIG:
+            # The flags contain information, if the size and digest differ
+            if '5' in modified_file.flags or 'S' in modified_file.flags:
                 modified = True
         # Ignore any other files lurking here
 
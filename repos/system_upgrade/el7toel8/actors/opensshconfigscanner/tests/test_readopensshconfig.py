@@ -1,4 +1,4 @@
-from leapp.models import OpenSshConfig, OpenSshPermitRootLogin
+from leapp.models import ModifiedConfigFile, OpenSshConfig, OpenSshPermitRootLogin
 from leapp.libraries.actor.readopensshconfig import parse_config, \
     produce_config, line_empty, parse_config_modification
 
@@ -140,26 +140,26 @@ def test_parse_config_empty():
 def test_parse_config_modification():
     # This one was modified
     data = [
-        "S.5....T.  c /etc/ssh/sshd_config",
+        ModifiedConfigFile(path='/etc/ssh/sshd_config', flags='S.5......'),
     ]
     assert parse_config_modification(data)
 
-    # This one was just touched (timestamp does not match)
+    # This one has just different user
     data = [
-        ".......T.  c /etc/ssh/sshd_config",
+        ModifiedConfigFile(path='/etc/ssh/sshd_config', flags='.....U...'),
     ]
     assert not parse_config_modification(data)
 
     # This one was not modified (not listed at all)
     data = [
-        ".......T.  c /etc/sysconfig/sshd",
+        ModifiedConfigFile(path='/etc/sysconfig/sshd', flags='S.5......'),
     ]
     assert not parse_config_modification(data)
 
-    # Parse multiple lines
+    # Parse multiple files
     data = [
-        "S.5....T.  c /etc/sysconfig/sshd",
-        "S.5....T.  c /etc/ssh/sshd_config",
+        ModifiedConfigFile(path='/etc/sysconfig/sshd', flags='S.5......'),
+        ModifiedConfigFile(path='/etc/ssh/sshd_config', flags='S.5......'),
     ]
     assert parse_config_modification(data)
 
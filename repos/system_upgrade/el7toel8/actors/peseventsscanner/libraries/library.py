@@ -1,10 +1,17 @@
+import hashlib
+import itertools
 import json
 import os
+import re
 from collections import namedtuple
 
+import six
+
 from leapp.exceptions import StopActorExecution, StopActorExecutionError
 from leapp import reporting
+from leapp.libraries.common import cache
 from leapp.libraries.common.config import architecture
+from leapp.libraries.common.config.version import version_to_tuple
 from leapp.libraries.stdlib import api
 from leapp.libraries.stdlib.config import is_verbose
 from leapp.models import (InstalledRedHatSignedRPM, PESRpmTransactionTasks, RepositoriesMap,
@@ -19,23 +26,51 @@ Event = namedtuple('Event', ['action',        # A string representing an event t
                              'architectures'  # A list of strings representing architectures
                              ])
 
+TransactionConfiguration = namedtuple('TransactionConfiguration', [
+    'to_install',  # A set of names of packages to install
+    'to_keep',     # A set of names of packages to keep
+    'to_remove'    # A set of names of packages to remove
+])
+
 EVENT_TYPES = ('Present', 'Removed', 'Deprecated', 'Replaced', 'Split', 'Merged', 'Moved', 'Renamed')
-RELEASES = ((7, 5), (7, 6), (7, 7), (7, 8), (8, 0), (8, 1))  # TODO: bad, bad hardcode
+
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+PES_EVENTS_CACHE_DIR = os.path.join(cache.CACHE_DIR, 'pes-events')
+PES_EVENTS_CACHE_VERSION = 3
+PES_TASKS_CACHE_NAME = 'tasks.json'
 
 
 def pes_events_scanner(pes_json_filepath):
     """Entrypoint to the library"""
     installed_pkgs = get_installed_pkgs()
     transaction_configuration = get_transaction_configuration()
-    events = get_events(pes_json_filepath)
     arch = api.current_actor().configuration.architecture
-    arch_events = filter_events_by_architecture(events, arch)
+    release_window = get_release_window()
+    arch_events, pes_hash = get_arch_events(pes_json_filepath, arch, release_window)
     add_output_pkgs_to_transaction_conf(transaction_configuration, arch_events)
-    tasks = process_events(arch_events, installed_pkgs)
+    tasks_cache_key = get_tasks_cache_key(pes_hash, arch, release_window, installed_pkgs)
+    tasks = process_events(arch_events, installed_pkgs, tasks_cache_key=tasks_cache_key)
     filter_out_transaction_conf_pkgs(tasks, transaction_configuration)
     produce_messages(tasks)
 
 
+def get_release_window():
+    """
+    Get the window of releases the PES events are processed for based on the source and target system versions.
+
+    :return: A tuple of two releases in format (major, minor) - the source one, which is not part of the window
+             anymore, and the target one
+    """
+    version = api.current_actor().configuration.version
+    return (version_to_tuple(version.source), version_to_tuple(version.target))
+
+
+def is_release_in_window(release, release_window):
+    source, target = release_window
+    return source < release <= target
+
+
 def get_installed_pkgs():
     """
     Get installed Red Hat-signed packages.
@@ -74,8 +109,9 @@ def _get_repositories_mapping():
             details={'Problem': 'Did not receive a message with mapped repositories'}
         )
 
+    arch = api.current_actor().configuration.architecture
     for repository in repositories_map_msg.repositories:
-        if repository.arch == api.current_actor().configuration.architecture:
+        if repository.arch == arch:
             repositories_mapping[repository.to_pes_repo] = repository.to_repoid
 
     return repositories_mapping
@@ -86,25 +122,28 @@ def get_transaction_configuration():
     Get pkgs to install, keep and remove from the user configuration files in /etc/leapp/transaction/.
 
     These configuration files have higher priority than PES data.
-    :return: RpmTransactionTasks model instance
+    :return: TransactionConfiguration tuple with sets of pkgs to install, keep and remove
     """
-    transaction_configuration = RpmTransactionTasks()
+    transaction_configuration = TransactionConfiguration(to_install=set(), to_keep=set(), to_remove=set())
 
     for tasks in api.consume(RpmTransactionTasks):
-        transaction_configuration.to_install.extend(tasks.to_install)
-        transaction_configuration.to_remove.extend(tasks.to_remove)
-        transaction_configuration.to_keep.extend(tasks.to_keep)
+        transaction_configuration.to_install.update(tasks.to_install)
+        transaction_configuration.to_remove.update(tasks.to_remove)
+        transaction_configuration.to_keep.update(tasks.to_keep)
     return transaction_configuration
 
 
-def get_events(pes_events_filepath):
+def get_events(pes_events_filepath, arch=None, release_window=None):
     """
-    Get all the events from the source JSON file exported from PES.
+    Get the events from the source JSON file exported from PES.
 
+    :param arch: When set, only events relevant for the given architecture are returned
+    :param release_window: When set, only events leading to a release within the window are returned
+                           (see get_release_window)
     :return: List of Event tuples, where each event contains event type and input/output pkgs
     """
     try:
-        return parse_pes_events_file(pes_events_filepath)
+        return parse_pes_events_file(pes_events_filepath, arch=arch, release_window=release_window)
     except (ValueError, KeyError):
         title = 'Missing/Invalid PES data file ({})'.format(pes_events_filepath)
         summary = 'Read documentation at: https://access.redhat.com/articles/3664871 for more information ' \
@@ -120,6 +159,118 @@ def get_events(pes_events_filepath):
         raise StopActorExecution()
 
 
+def get_arch_events(pes_events_filepath, arch, release_window):
+    """
+    Get the events relevant for the given architecture and leading to a release within the release window.
+
+    The events are loaded from the cache of previously parsed PES data when the cache is up to date with the source
+    JSON file. Otherwise the JSON file is parsed and the cache is refreshed.
+
+    :return: Tuple with the list of relevant Event tuples and the sha256 hash of the PES data file
+    """
+    cache_path = os.path.join(PES_EVENTS_CACHE_DIR, '{}.json'.format(arch))
+    cached = load_events_cache(cache_path, pes_events_filepath, release_window)
+    if cached is not None:
+        return cached
+    events = get_events(pes_events_filepath, arch=arch, release_window=release_window)
+    pes_hash = _get_file_hash(pes_events_filepath)
+    store_events_cache(cache_path, pes_events_filepath, release_window, events, pes_hash)
+    return events, pes_hash
+
+
+def _get_file_hash(path):
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def load_events_cache(cache_path, pes_events_filepath, release_window):
+    """
+    Load events from the cache if it has been created from the current content of the PES data file.
+
+    Events are cached just for one release window, the one used the last time.
+
+    The cache is considered current when the modification time and size of the PES data file did not change since
+    the cache was created, or when the hash of the file content is still the same.
+
+    :return: Tuple with the list of Event tuples and the sha256 hash of the PES data file, or None when the cache
+             is missing, invalid or outdated
+    """
+    if not os.path.isfile(pes_events_filepath):
+        return None
+    cached = cache.load(cache_path, PES_EVENTS_CACHE_VERSION)
+    if cached is None:
+        return None
+    try:
+        if cached['release_window'] != [list(release) for release in release_window]:
+            return None
+        stamp = cache.get_file_stamp(pes_events_filepath)
+        if cached['stamp'] != stamp:
+            if cached['sha256'] != _get_file_hash(pes_events_filepath):
+                return None
+            # the file has been just touched or copied, remember the new stamp to avoid hashing it next time
+            cached['stamp'] = stamp
+            cache.store(cache_path, cached, PES_EVENTS_CACHE_VERSION)
+        events = [Event(action, in_pkgs, out_pkgs, tuple(from_release), tuple(to_release), architectures)
+                  for action, in_pkgs, out_pkgs, from_release, to_release, architectures in cached['events']]
+        return events, cached['sha256']
+    except (EnvironmentError, ValueError, KeyError, TypeError) as err:
+        api.current_logger().debug('Ignoring invalid cache of PES events {}: {}'.format(cache_path, err))
+        return None
+
+
+def store_events_cache(cache_path, pes_events_filepath, release_window, events, pes_hash):
+    """
+    Store already parsed and validated events together with the information about the PES data file they come from.
+
+    Events are stored as flat lists of their fields to make the cache compact and fast to load. Failure to store
+    the cache is not fatal, the PES data file is just parsed again next time.
+    """
+    cache.store(cache_path, {
+        'stamp': cache.get_file_stamp(pes_events_filepath),
+        'sha256': pes_hash,
+        'release_window': [list(release) for release in release_window],
+        'events': [list(event) for event in events],
+    }, PES_EVENTS_CACHE_VERSION)
+
+
+def get_tasks_cache_key(pes_hash, arch, release_window, installed_pkgs):
+    """
+    Get a fingerprint of all the inputs the tasks computed from PES events depend on.
+
+    The transaction configuration, repositories mapping and blacklisted repositories are not part of the fingerprint
+    as they are applied on the computed tasks on every run.
+
+    :param pes_hash: sha256 hash of the PES data file, as returned by get_arch_events
+    """
+    key = hashlib.sha256()
+    key.update(pes_hash.encode('utf-8'))
+    key.update(json.dumps([arch, release_window, sorted(installed_pkgs)]).encode('utf-8'))
+    return key.hexdigest()
+
+
+def load_tasks_cache(cache_key):
+    """
+    Load tasks computed from PES events by a previous run with the same inputs.
+
+    :return: A dict with three dicts holding pkgs to keep, to install and to remove or None when not cached
+    """
+    cached = cache.load(os.path.join(PES_EVENTS_CACHE_DIR, PES_TASKS_CACHE_NAME), PES_EVENTS_CACHE_VERSION)
+    if cached is None or cached.get('key') != cache_key:
+        return None
+    tasks = cached.get('tasks')
+    if not isinstance(tasks, dict) or sorted(tasks.keys()) != ['to_install', 'to_keep', 'to_remove']:
+        return None
+    return tasks
+
+
+def store_tasks_cache(cache_key, tasks):
+    cache.store(os.path.join(PES_EVENTS_CACHE_DIR, PES_TASKS_CACHE_NAME), {'key': cache_key, 'tasks': tasks},
+                PES_EVENTS_CACHE_VERSION)
+
+
 def filter_events_by_architecture(events, arch):
     filtered_events = []
     for event in events:
@@ -128,21 +279,121 @@ def filter_events_by_architecture(events, arch):
     return filtered_events
 
 
-def parse_pes_events_file(path):
+def parse_pes_events_file(path, arch=None, release_window=None):
     """
     Parse JSON file returning PES events
 
+    :param arch: When set, only events relevant for the given architecture are returned
+    :param release_window: When set, only events leading to a release within the window are returned
     :return: List of Event tuples, where each event contains event type and input/output pkgs
     """
+    return list(iter_pes_events_file(path, arch=arch, release_window=release_window))
+
+
+def iter_pes_events_file(path, arch=None, release_window=None):
+    """
+    Parse JSON file yielding PES events one by one
+
+    The file is decoded incrementally, so only the events matching the given architecture and release window are
+    kept in memory by the caller instead of the whole PES data.
+
+    :param arch: When set, only events relevant for the given architecture are yielded
+    :param release_window: When set, only events leading to a release within the window are yielded
+    """
     if path is None or not os.path.isfile(path):
         raise ValueError('File {} not found'.format(path))
     with open(path) as f:
-        data = json.load(f)
-
-        if not isinstance(data, dict) or not data.get('packageinfo'):
+        found = False
+        for entry in PESEntriesReader(f).entries():
+            found = True
+            event = parse_entry(entry)
+            if arch and event.architectures and arch not in event.architectures:
+                continue
+            if release_window and not is_release_in_window(event.to_release, release_window):
+                continue
+            yield event
+        if not found:
             raise ValueError('Found PES data with invalid structure')
 
-        return [parse_entry(entry) for entry in data['packageinfo']]
+
+class PESEntriesReader(object):
+    """
+    Incremental reader of entries of the "packageinfo" array in the JSON file exported from PES.
+
+    Only a small part of the file is held in memory at a time and entries are decoded one by one.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, f):
+        self._file = f
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read_more(self):
+        data = self._file.read(self.CHUNK_SIZE)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Skip whitespace and return the next character without consuming it (empty string at the end of file)"""
+        while True:
+            self._pos = _JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more():
+                return ''
+
+    def _expect(self, chars):
+        """Consume the next character, which has to be one of the given ones, and return it"""
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError('Found PES data with invalid structure')
+        self._pos += 1
+        return char
+
+    def _decode(self):
+        """Decode the next JSON value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A value at the very end of the buffer (e.g. a number) might continue in the data not read yet
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            self._read_more()
+
+    def entries(self):
+        """Yield entries of the "packageinfo" array, skipping any other top level data"""
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._decode()
+            if not isinstance(key, six.string_types):
+                raise ValueError('Found PES data with invalid structure')
+            self._expect(':')
+            if key != 'packageinfo':
+                self._decode()
+            elif self._expect('[') and self._peek() != ']':
+                while True:
+                    yield self._decode()
+                    if self._expect(',]') == ']':
+                        break
+            else:
+                self._expect(']')
+            if self._expect(',}') == '}':
+                return
 
 
 def parse_entry(entry):
@@ -232,6 +483,114 @@ def parse_architectures(architectures):
     return architectures
 
 
+def index_events(events):
+    """
+    Index PES events by their target release and by the names of their input packages.
+
+    The index is built once so that processing of the events visits only those events whose input packages are
+    installed or scheduled to be installed, instead of scanning all the PES events for each release. Events are
+    stored together with their position in the original list to keep the order in which they are processed.
+
+    :param events: List of Event tuples
+    :return: A dict in format {<to_release>: {<in_pkg_name>: [(<position>, <Event>), ...]}}; events without any
+             input package are stored under the None key
+    """
+    index = {}
+    for position, event in enumerate(events):
+        release_index = index.setdefault(event.to_release, {})
+        for pkg in event.in_pkgs or (None,):
+            release_index.setdefault(pkg, []).append((position, event))
+    return index
+
+
+def get_relevant_release_events(release_index, installed_pkgs, tasks):
+    """
+    Get events of one release which are applicable given the installed packages and tasks planned so far.
+
+    :param release_index: A dict in format {<in_pkg_name>: [(<position>, <Event>), ...]} (see index_events)
+    :param installed_pkgs: Set of names of the installed Red Hat-signed packages
+    :param tasks: A dict with three dicts holding pkgs to keep, to install and to remove
+    :return: List of relevant Event tuples in their original order
+    """
+    candidates = {}
+    for pkg in itertools.chain((None,), installed_pkgs, tasks['to_install']):
+        for position, event in release_index.get(pkg, ()):
+            candidates[position] = event
+    return [candidates[position] for position in sorted(candidates)
+            if is_event_relevant(candidates[position], installed_pkgs, tasks)]
+
+
+def get_evolution_step(event, pkg):
+    """
+    Get names of the packages an input package of the event evolves into.
+
+    :param event: Event tuple having the given package among its input packages
+    :param pkg: Name of the input package
+    :return: Set of names of packages
+    """
+    if event.action == 'Removed':
+        return set()
+    if event.action in ('Split', 'Merged', 'Renamed', 'Replaced'):
+        return set(event.out_pkgs)
+    # Present, Deprecated and Moved events do not change the name of the package
+    return {pkg}
+
+
+def build_evolution_graph(events):
+    """
+    Build a directed graph of the package evolution through the releases the events lead to.
+
+    :param events: List of Event tuples
+    :return: A list with one dict per release in format {<pkg_name>: <set of names of pkgs it evolves into>};
+             packages without any event in the release are not present in its dict as they do not change
+    """
+    events_index = index_events(events)
+    graph = []
+    for release in sorted(events_index):
+        edges = {}
+        for pkg, indexed_events in events_index[release].items():
+            if pkg is None:
+                continue
+            edges[pkg] = set()
+            for dummy_position, event in indexed_events:
+                edges[pkg].update(get_evolution_step(event, pkg))
+        graph.append(edges)
+    return graph
+
+
+def get_evolution_closure(graph):
+    """
+    Precompute transitive closure of the evolution graph for all the packages with any event.
+
+    The closure is built from the last release backwards, so each event is visited just once regardless of the
+    length of the chains of events.
+
+    :param graph: Evolution graph as built by build_evolution_graph
+    :return: A dict in format {<pkg_name>: <frozenset of names of pkgs it finally evolves into>}
+    """
+    closure = {}
+    for edges in reversed(graph):
+        release_closure = dict(closure)
+        for pkg, targets in edges.items():
+            result = set()
+            for target in targets:
+                result.update(closure.get(target, (target,)))
+            release_closure[pkg] = frozenset(result)
+        closure = release_closure
+    return closure
+
+
+def get_package_evolution(closure, pkg):
+    """
+    Get names of the packages the given package finally evolves into.
+
+    :param closure: Transitive closure of the evolution graph as created by get_evolution_closure
+    :param pkg: Name of the package
+    :return: Frozenset of names of packages; empty when the package is removed
+    """
+    return closure.get(pkg, frozenset([pkg]))
+
+
 def is_event_relevant(event, installed_pkgs, tasks):
     """Determine if event is applicable given the installed packages and tasks planned so far."""
     for package in event.in_pkgs.keys():
@@ -249,54 +608,108 @@ def add_packages_to_tasks(tasks, packages, key):
         tasks[key].update(packages)
 
 
-def process_events(events, installed_pkgs):
+def process_events(events, installed_pkgs, tasks_cache_key=None):
     """
     Process PES events to get lists of pkgs to keep, to install and to remove.
 
     :param events: List of Event tuples, not including those events with their "input" packages not installed
     :param installed_pkgs: Set of names of the installed Red Hat-signed packages
+    :param tasks_cache_key: When set, the tasks computed from the events are reused from the previous run with
+                            the same key if possible, or cached for the next run (see get_tasks_cache_key)
     :return: A dict with three dicts holding pkgs to keep, to install and to remove
     """
+    tasks = load_tasks_cache(tasks_cache_key) if tasks_cache_key else None
+    if tasks is None:
+        tasks = get_events_tasks(index_events(events), installed_pkgs)
+        if tasks_cache_key:
+            store_tasks_cache(tasks_cache_key, tasks)
+    else:
+        api.current_logger().debug('Reusing PES events tasks computed by the previous run')
 
+    repositories_mapping = _get_repositories_mapping()
+    map_repositories(tasks['to_install'], repositories_mapping)
+    map_repositories(tasks['to_keep'], repositories_mapping)
+    filter_out_pkgs_in_blacklisted_repos(tasks['to_install'])
+    resolve_conflicting_requests(tasks)
+
+    return tasks
+
+
+def process_events_for_hosts(events, hosts_installed_pkgs, repositories_mapping, blacklisted_repos=()):
+    """
+    Process PES events for many systems at once, e.g. to plan upgrades of a fleet of systems offline.
+
+    The events index is built just once and shared for all the systems. Unlike process_events, no reports
+    are created about the skipped packages, they are returned as part of the results instead.
+
+    :param events: List of Event tuples
+    :param hosts_installed_pkgs: A dict in format {<host>: <set of names of the installed Red Hat-signed packages>}
+    :param repositories_mapping: A dict mapping PES repositories to RHSM repository ids (see _get_repositories_mapping)
+    :param blacklisted_repos: Iterable of blacklisted RHSM repository ids
+    :return: A dict in format {<host>: <tasks>}, where tasks is a dict with three dicts holding pkgs to keep,
+             to install and to remove, the 'to_enable' list of repositories and the 'skipped' list of pkgs
+    """
+    events_index = index_events(events)
+    blacklisted_repos = set(blacklisted_repos)
+    results = {}
+    for host, installed_pkgs in hosts_installed_pkgs.items():
+        tasks = get_events_tasks(events_index, installed_pkgs)
+        skipped = apply_repositories_mapping(tasks['to_install'], repositories_mapping)
+        skipped |= apply_repositories_mapping(tasks['to_keep'], repositories_mapping)
+        skipped |= filter_out_pkgs_in_repos(tasks['to_install'], blacklisted_repos)
+        resolve_conflicting_requests(tasks)
+        tasks['to_enable'] = sorted(set(tasks['to_install'].values()) | set(tasks['to_keep'].values()))
+        tasks['skipped'] = sorted(skipped)
+        results[host] = tasks
+    return results
+
+
+def get_events_tasks(events_index, installed_pkgs):
+    """
+    Get pkgs to keep, to install and to remove with their PES repositories based on the relevant PES events.
+
+    :param events_index: A dict with PES events as created by index_events
+    :param installed_pkgs: Set of names of the installed Red Hat-signed packages
+    :return: A dict with three dicts holding pkgs to keep, to install and to remove
+    """
     tasks = {  # Contains dicts in format {<pkg_name>: <repository>}
         'to_keep': {},
         'to_install': {},
         'to_remove': {}
     }
-    for release in RELEASES:
+    for release in sorted(events_index):
         current = {
             'to_keep': {},
             'to_install': {},
             'to_remove': {}
         }
-        release_events = [e for e in events if e.to_release == release]
+        release_events = get_relevant_release_events(events_index.get(release, {}), installed_pkgs, tasks)
         api.current_logger().debug('---- Processing {n} eligible events for release {r}'.format(
             n=len(release_events), r=release))
         for event in release_events:
-            if is_event_relevant(event, installed_pkgs, tasks):
-                if event.action in ('Deprecated', 'Present'):
-                    # Add these packages to to_keep to make sure the repo they're in on RHEL 8 gets enabled
-                    add_packages_to_tasks(current, event.in_pkgs, 'to_keep')
-
-                if event.action == 'Moved':
-                    # Add these packages to to_keep to make sure the repo they're in on RHEL 8 gets enabled
-                    # We don't care about the "in_pkgs" as it contains always just one pkg - the same as the "out" pkg
-                    add_packages_to_tasks(current, event.out_pkgs, 'to_keep')
-
-                if event.action in ('Split', 'Merged', 'Renamed', 'Replaced'):
-                    non_installed_out_pkgs = filter_out_installed_pkgs(event.out_pkgs, installed_pkgs)
-                    add_packages_to_tasks(current, non_installed_out_pkgs, 'to_install')
-                    # Add already installed "out" pkgs to to_keep to ensure the repo they're in on RHEL 8 gets enabled
-                    installed_out_pkgs = get_installed_event_pkgs(event.out_pkgs, installed_pkgs)
-                    add_packages_to_tasks(current, installed_out_pkgs, 'to_keep')
-
-                    if event.action in ('Split', 'Merged'):
-                        # Uninstall those RHEL 7 pkgs that are no longer on RHEL 8
-                        in_pkgs_without_out_pkgs = filter_out_out_pkgs(event.in_pkgs, event.out_pkgs)
-                        add_packages_to_tasks(current, in_pkgs_without_out_pkgs, 'to_remove')
-
-                if event.action in ('Renamed', 'Replaced', 'Removed'):
-                    add_packages_to_tasks(current, event.in_pkgs, 'to_remove')
+            if event.action in ('Deprecated', 'Present'):
+                # Add these packages to to_keep to make sure the repo they're in on RHEL 8 gets enabled
+                add_packages_to_tasks(current, event.in_pkgs, 'to_keep')
+
+            if event.action == 'Moved':
+                # Add these packages to to_keep to make sure the repo they're in on RHEL 8 gets enabled
+                # We don't care about the "in_pkgs" as it contains always just one pkg - the same as the "out" pkg
+                add_packages_to_tasks(current, event.out_pkgs, 'to_keep')
+
+            if event.action in ('Split', 'Merged', 'Renamed', 'Replaced'):
+                non_installed_out_pkgs = filter_out_installed_pkgs(event.out_pkgs, installed_pkgs)
+                add_packages_to_tasks(current, non_installed_out_pkgs, 'to_install')
+                # Add already installed "out" pkgs to to_keep to ensure the repo they're in on RHEL 8 gets enabled
+                installed_out_pkgs = get_installed_event_pkgs(event.out_pkgs, installed_pkgs)
+                add_packages_to_tasks(current, installed_out_pkgs, 'to_keep')
+
+                if event.action in ('Split', 'Merged'):
+                    # Uninstall those RHEL 7 pkgs that are no longer on RHEL 8
+                    in_pkgs_without_out_pkgs = filter_out_out_pkgs(event.in_pkgs, event.out_pkgs)
+                    add_packages_to_tasks(current, in_pkgs_without_out_pkgs, 'to_remove')
+
+            if event.action in ('Renamed', 'Replaced', 'Removed'):
+                add_packages_to_tasks(current, event.in_pkgs, 'to_remove')
 
         do_not_remove = set()
         for package in current['to_remove']:
@@ -339,11 +752,6 @@ def process_events(events, installed_pkgs):
                             p=package, r=current[key][package], v=verbs[key]))
             tasks[key].update(current[key])
 
-    map_repositories(tasks['to_install'])
-    map_repositories(tasks['to_keep'])
-    filter_out_pkgs_in_blacklisted_repos(tasks['to_install'])
-    resolve_conflicting_requests(tasks)
-
     return tasks
 
 
@@ -382,20 +790,25 @@ def filter_out_pkgs_in_blacklisted_repos(to_install):
     """
     # FIXME The to_install contains just a limited subset of packages - those that are *not* currently installed and
     # are to be installed. But we should also warn about the packages that *are* installed.
-    blacklisted_pkgs = set()
-    blacklisted_repos = get_repositories_blacklisted()
-    for pkg, repo in to_install.items():
-        if repo in blacklisted_repos:
-            blacklisted_pkgs.add(pkg)
-
-    for pkg in blacklisted_pkgs:
-        del to_install[pkg]
-
+    blacklisted_pkgs = filter_out_pkgs_in_repos(to_install, get_repositories_blacklisted())
     if blacklisted_pkgs:
         report_skipped_packages('packages will not be installed due to blacklisted repositories:',
                                 blacklisted_pkgs)
 
 
+def filter_out_pkgs_in_repos(packages, repos):
+    """
+    Remove packages that are in any of the given repositories.
+
+    :param packages: A dict with packages in format {<pkg_name>: <repository>}
+    :return: Set of names of the removed packages
+    """
+    pkgs_in_repos = {pkg for pkg, repo in packages.items() if repo in repos}
+    for pkg in pkgs_in_repos:
+        del packages[pkg]
+    return pkgs_in_repos
+
+
 def resolve_conflicting_requests(tasks):
     """
     Do not remove what is supposed to be kept or installed.
@@ -425,9 +838,31 @@ def get_repositories_blacklisted():
     return repos_blacklisted
 
 
-def map_repositories(packages):
-    """Map repositories from PES data to RHSM repository id"""
-    repositories_mapping = _get_repositories_mapping()
+def map_repositories(packages, repositories_mapping=None):
+    """
+    Map repositories from PES data to RHSM repository id
+
+    :param repositories_mapping: Already built mapping of repositories to share it between multiple calls;
+                                 consumed from the RepositoriesMap message when not provided
+    """
+    if repositories_mapping is None:
+        repositories_mapping = _get_repositories_mapping()
+    repo_without_mapping = apply_repositories_mapping(packages, repositories_mapping)
+    if repo_without_mapping:
+        report_skipped_packages('packages will not be installed or upgraded due to repositories unknown to leapp:',
+                                repo_without_mapping)
+
+
+def apply_repositories_mapping(packages, repositories_mapping):
+    """
+    Replace PES repositories of packages with the mapped RHSM repository ids.
+
+    Packages in repositories without mapping are removed.
+
+    :param packages: A dict with packages in format {<pkg_name>: <repository>}
+    :param repositories_mapping: A dict mapping PES repositories to RHSM repository ids
+    :return: Set of names of the removed packages
+    """
     repo_without_mapping = set()
     for pkg, repo in packages.items():
         if repo not in repositories_mapping:
@@ -439,9 +874,7 @@ def map_repositories(packages):
     for pkg in repo_without_mapping:
         del packages[pkg]
 
-    if repo_without_mapping:
-        report_skipped_packages('packages will not be installed or upgraded due to repositories unknown to leapp:',
-                                repo_without_mapping)
+    return repo_without_mapping
 
 
 def report_skipped_packages(message, packages):
@@ -465,23 +898,24 @@ def add_output_pkgs_to_transaction_conf(transaction_configuration, events):
 
     Output packages from an event are added to packages for removal only if all input packages are already there.
 
-    :param transaction_configuration: RpmTransactionTasks model instance with pkgs to install, keep and remove based
-                                      on the user configuration files
+    :param transaction_configuration: TransactionConfiguration tuple with sets of pkgs to install, keep and remove
+                                      based on the user configuration files
     :param events: List of Event tuples, where each event contains event type and input/output pkgs
     """
-    message = 'Marking packages for removal:\n'
+    to_remove = transaction_configuration.to_remove
+    messages = ['Marking packages for removal:']
 
     for event in events:
         if event.action in ('Split', 'Merged', 'Replaced', 'Renamed'):
-            if all([pkg in transaction_configuration.to_remove for pkg in event.in_pkgs]):
-                transaction_configuration.to_remove.extend(event.out_pkgs)
-                message += '- [{action}] {ins} -> {outs}\n'.format(
+            if to_remove.issuperset(event.in_pkgs):
+                to_remove.update(event.out_pkgs)
+                messages.append('- [{action}] {ins} -> {outs}'.format(
                     action=event.action,
                     ins=', '.join(sorted(event.in_pkgs.keys())),
                     outs=', '.join(sorted(event.out_pkgs.keys()))
-                )
+                ))
 
-    api.current_logger().debug(message)
+    api.current_logger().debug('\n'.join(messages) + '\n')
 
 
 def filter_out_transaction_conf_pkgs(tasks, transaction_configuration):
@@ -489,22 +923,13 @@ def filter_out_transaction_conf_pkgs(tasks, transaction_configuration):
     Filter out those PES events conflicting with the higher priority transaction configuration files.
 
     :param tasks: A dict with three dicts holding pkgs to keep, to install and to remove
-    :param transaction_configuration: RpmTransactionTasks model instance with pkgs to install, keep and remove based
-                                      on the user configuration files
-    """
-    pkgs_not_to_be_kept = []
-    pkgs_not_to_be_installed = []
-    pkgs_not_to_be_removed = []
-
-    for pkg_to_keep in tasks['to_keep']:
-        if pkg_to_keep in transaction_configuration.to_remove:
-            pkgs_not_to_be_kept.append(pkg_to_keep)
-    for pkg_to_install in tasks['to_install']:
-        if pkg_to_install in transaction_configuration.to_remove:
-            pkgs_not_to_be_installed.append(pkg_to_install)
-    for pkg_to_remove in tasks['to_remove']:
-        if pkg_to_remove in transaction_configuration.to_install + transaction_configuration.to_keep:
-            pkgs_not_to_be_removed.append(pkg_to_remove)
+    :param transaction_configuration: TransactionConfiguration tuple with sets of pkgs to install, keep and remove
+                                      based on the user configuration files
+    """
+    pkgs_not_to_be_kept = transaction_configuration.to_remove.intersection(tasks['to_keep'])
+    pkgs_not_to_be_installed = transaction_configuration.to_remove.intersection(tasks['to_install'])
+    pkgs_not_to_be_removed = (transaction_configuration.to_install | transaction_configuration.to_keep).intersection(
+        tasks['to_remove'])
 
     for pkg in pkgs_not_to_be_kept:
         # Removing a package from the to_keep dict may cause that some repositories won't get enabled
@@ -1,24 +1,35 @@
+import json
 import os.path
+import shutil
 
 import pytest
 
 from leapp.exceptions import StopActorExecution
 from leapp.libraries.actor import library
 from leapp.libraries.actor.library import (Event,
-                                           RELEASES,
+                                           TransactionConfiguration,
                                            add_output_pkgs_to_transaction_conf,
+                                           build_evolution_graph,
                                            filter_out_pkgs_in_blacklisted_repos,
                                            filter_events_by_architecture,
+                                           filter_out_transaction_conf_pkgs,
+                                           iter_pes_events_file,
+                                           get_arch_events,
                                            get_events,
+                                           get_evolution_closure,
+                                           get_package_evolution,
+                                           get_relevant_release_events,
+                                           get_tasks_cache_key,
+                                           index_events,
                                            map_repositories, parse_action,
                                            parse_entry, parse_packageset,
                                            parse_pes_events_file,
                                            process_events,
+                                           process_events_for_hosts,
                                            report_skipped_packages)
 from leapp import reporting
 from leapp.libraries.common.testutils import produce_mocked, create_report_mocked
 from leapp.libraries.stdlib import api
-from leapp.models import RpmTransactionTasks
 
 
 class show_message_mocked(object):
@@ -100,6 +111,40 @@ def test_parse_pes_events_file(current_actor_context):
     assert events[1].out_pkgs == {}
 
 
+def test_iter_pes_events_file(monkeypatch, tmpdir):
+    def entry(event_id, arch, release):
+        return {'id': event_id,
+                'action': 1,
+                'in_packageset': {'package': [{'name': 'pkg{}'.format(event_id), 'repository': 'repo'}]},
+                'release': {'major_version': release[0], 'minor_version': release[1]},
+                'architectures': arch}
+
+    data = {'legal_notice': {'text': 'data preceding the "packageinfo" key are skipped'},
+            'packageinfo': [entry(1, [], (8, 0)),
+                            entry(2, ['s390x'], (8, 0)),
+                            entry(3, ['x86_64', 's390x'], (8, 0)),
+                            entry(4, ['x86_64'], (8, 2)),
+                            entry(5, ['x86_64'], (8, 1))],
+            'timestamp': 123456}
+    pes_file = str(tmpdir.join('pes-events.json'))
+    with open(pes_file, 'w') as f:
+        json.dump(data, f, indent=4)
+    # decode the file in small chunks to check the values spanning more reads
+    monkeypatch.setattr(library.PESEntriesReader, 'CHUNK_SIZE', 7)
+
+    assert [list(e.in_pkgs)[0] for e in iter_pes_events_file(pes_file)] == ['pkg1', 'pkg2', 'pkg3', 'pkg4', 'pkg5']
+    assert [list(e.in_pkgs)[0] for e in iter_pes_events_file(pes_file, arch='x86_64')] == ['pkg1', 'pkg3', 'pkg4',
+                                                                                           'pkg5']
+    events = iter_pes_events_file(pes_file, arch='x86_64', release_window=((7, 9), (8, 1)))
+    assert [list(e.in_pkgs)[0] for e in events] == ['pkg1', 'pkg3', 'pkg5']
+
+    for invalid in ('', '[]', '{"packageinfo": []}', '{"packageinfo": [{"action": 1}'):
+        with open(pes_file, 'w') as f:
+            f.write(invalid)
+        with pytest.raises((ValueError, KeyError)):
+            list(iter_pes_events_file(pes_file))
+
+
 def test_report_skipped_packages(monkeypatch):
     monkeypatch.setattr(api, 'produce', produce_mocked())
     monkeypatch.setattr(api, 'show_message', show_message_mocked())
@@ -156,9 +201,9 @@ def test_filter_out_pkgs_in_blacklisted_repos(monkeypatch):
 
 
 def test_resolve_conflicting_requests(monkeypatch):
-    monkeypatch.setattr(library, 'map_repositories', lambda x: x)
+    monkeypatch.setattr(library, 'map_repositories', lambda x, *args: x)
+    monkeypatch.setattr(library, '_get_repositories_mapping', lambda: {})
     monkeypatch.setattr(library, 'filter_out_pkgs_in_blacklisted_repos', lambda x: x)
-    monkeypatch.setattr(library, 'RELEASES', ((7, 5), (7, 6), (7, 7), (7, 8), (8, 0), (8, 1)))
 
     events = [
         Event('Split', {'sip-devel': 'repo'}, {'python3-sip-devel': 'repo', 'sip': 'repo'}, (7, 6), (8, 0), []),
@@ -199,9 +244,10 @@ def test_map_repositories(monkeypatch):
 
 
 def test_process_events(monkeypatch):
-    monkeypatch.setattr(library, '_get_repositories_mapping', lambda: {'rhel8-repo': 'rhel8-mapped'})
+    mapping_calls = []
+    monkeypatch.setattr(library, '_get_repositories_mapping',
+                        lambda: mapping_calls.append(1) or {'rhel8-repo': 'rhel8-mapped'})
     monkeypatch.setattr(library, 'get_repositories_blacklisted', get_repos_blacklisted_mocked(set()))
-    monkeypatch.setattr(library, 'RELEASES', ((7, 5), (7, 6), (7, 7), (7, 8), (8, 0), (8, 1)))
 
     events = [
         Event('Split', {'original': 'rhel7-repo'}, {'split01': 'rhel8-repo', 'split02': 'rhel8-repo'},
@@ -214,6 +260,59 @@ def test_process_events(monkeypatch):
     assert tasks['to_install'] == {'split02': 'rhel8-mapped', 'split01': 'rhel8-mapped'}
     assert tasks['to_remove'] == {'removed': 'rhel7-repo', 'original': 'rhel7-repo'}
     assert tasks['to_keep'] == {'present': 'rhel8-mapped'}
+    # the mapping is built just once for all the packages
+    assert len(mapping_calls) == 1
+
+
+def test_process_events_tasks_cache(monkeypatch, tmpdir):
+    monkeypatch.setattr(library, 'PES_EVENTS_CACHE_DIR', str(tmpdir.join('cache')))
+    monkeypatch.setattr(library, '_get_repositories_mapping', lambda: {'rhel8-repo': 'rhel8-mapped'})
+    monkeypatch.setattr(library, 'get_repositories_blacklisted', get_repos_blacklisted_mocked(set()))
+    pes_file = str(tmpdir.join('pes-events.json'))
+    shutil.copy('files/tests/sample01.json', pes_file)
+
+    events = [
+        Event('Split', {'original': 'rhel7-repo'}, {'split01': 'rhel8-repo', 'split02': 'rhel8-repo'},
+              (7, 6), (8, 0), []),
+        Event('Removed', {'removed': 'rhel7-repo'}, {}, (7, 6), (8, 0), [])]
+    installed_pkgs = {'original', 'removed'}
+    window = ((7, 6), (8, 1))
+    pes_hash = library._get_file_hash(pes_file)
+    key = get_tasks_cache_key(pes_hash, 'x86_64', window, installed_pkgs)
+    expected = {'to_install': {'split01': 'rhel8-mapped', 'split02': 'rhel8-mapped'},
+                'to_remove': {'removed': 'rhel7-repo', 'original': 'rhel7-repo'},
+                'to_keep': {}}
+
+    assert process_events(events, installed_pkgs, tasks_cache_key=key) == expected
+    # events are not processed again for the same inputs
+    assert process_events([], installed_pkgs, tasks_cache_key=key) == expected
+
+    assert get_tasks_cache_key(pes_hash, 'x86_64', window, {'original'}) != key
+    assert get_tasks_cache_key(pes_hash, 's390x', window, installed_pkgs) != key
+    assert get_tasks_cache_key(pes_hash, 'x86_64', ((7, 6), (8, 2)), installed_pkgs) != key
+    with open(pes_file, 'a') as f:
+        f.write('\n')
+    assert get_tasks_cache_key(library._get_file_hash(pes_file), 'x86_64', window, installed_pkgs) != key
+
+
+def test_process_events_for_hosts():
+    events = [
+        Event('Split', {'original': 'rhel7-repo'}, {'split01': 'rhel8-repo', 'split02': 'rhel8-blacklisted'},
+              (7, 6), (8, 0), []),
+        Event('Removed', {'removed': 'rhel7-repo'}, {}, (7, 6), (8, 0), []),
+        Event('Present', {'present': 'rhel8-unknown'}, {}, (7, 6), (8, 0), [])]
+    hosts = {'host1': {'original', 'removed'}, 'host2': {'present'}, 'host3': set()}
+    mapping = {'rhel8-repo': 'rhel8-mapped', 'rhel8-blacklisted': 'blacklisted'}
+
+    results = process_events_for_hosts(events, hosts, mapping, blacklisted_repos=['blacklisted'])
+
+    assert results['host1']['to_install'] == {'split01': 'rhel8-mapped'}
+    assert results['host1']['to_remove'] == {'original': 'rhel7-repo', 'removed': 'rhel7-repo'}
+    assert results['host1']['to_enable'] == ['rhel8-mapped']
+    assert results['host1']['skipped'] == ['split02']
+    assert results['host2']['to_keep'] == {}
+    assert results['host2']['skipped'] == ['present']
+    assert results['host3'] == {'to_install': {}, 'to_keep': {}, 'to_remove': {}, 'to_enable': [], 'skipped': []}
 
 
 def test_get_events(monkeypatch):
@@ -243,6 +342,10 @@ def test_pes_data_not_found(monkeypatch):
     assert 'inhibitor' in reporting.create_report.report_fields['flags']
 
 
+def _transaction_conf(to_install=(), to_keep=(), to_remove=()):
+    return TransactionConfiguration(to_install=set(to_install), to_keep=set(to_keep), to_remove=set(to_remove))
+
+
 def test_add_output_pkgs_to_transaction_conf():
     events = [
         Event('Split', {'split_in': 'repo'}, {'split_out1': 'repo', 'split_out2': 'repo'}, (7, 6), (8, 0), []),
@@ -251,27 +354,27 @@ def test_add_output_pkgs_to_transaction_conf():
         Event('Replaced', {'replaced_in': 'repo'}, {'replaced_out': 'repo'}, (7, 6), (8, 0), []),
     ]
 
-    conf_empty = RpmTransactionTasks()
+    conf_empty = _transaction_conf()
     add_output_pkgs_to_transaction_conf(conf_empty, events)
-    assert conf_empty.to_remove == []
+    assert conf_empty.to_remove == set()
 
-    conf_split = RpmTransactionTasks(to_remove=['split_in'])
+    conf_split = _transaction_conf(to_remove=['split_in'])
     add_output_pkgs_to_transaction_conf(conf_split, events)
     assert sorted(conf_split.to_remove) == ['split_in', 'split_out1', 'split_out2']
 
-    conf_merged_incomplete = RpmTransactionTasks(to_remove=['merged_in1'])
+    conf_merged_incomplete = _transaction_conf(to_remove=['merged_in1'])
     add_output_pkgs_to_transaction_conf(conf_merged_incomplete, events)
-    assert conf_merged_incomplete.to_remove == ['merged_in1']
+    assert conf_merged_incomplete.to_remove == {'merged_in1'}
 
-    conf_merged = RpmTransactionTasks(to_remove=['merged_in1', 'merged_in2'])
+    conf_merged = _transaction_conf(to_remove=['merged_in1', 'merged_in2'])
     add_output_pkgs_to_transaction_conf(conf_merged, events)
     assert sorted(conf_merged.to_remove) == ['merged_in1', 'merged_in2', 'merged_out']
 
-    conf_renamed = RpmTransactionTasks(to_remove=['renamed_in'])
+    conf_renamed = _transaction_conf(to_remove=['renamed_in'])
     add_output_pkgs_to_transaction_conf(conf_renamed, events)
     assert sorted(conf_renamed.to_remove) == ['renamed_in', 'renamed_out']
 
-    conf_replaced = RpmTransactionTasks(to_remove=['replaced_in'])
+    conf_replaced = _transaction_conf(to_remove=['replaced_in'])
     add_output_pkgs_to_transaction_conf(conf_replaced, events)
     assert sorted(conf_replaced.to_remove) == ['replaced_in', 'replaced_out']
 
@@ -289,3 +392,109 @@ def test_filter_events_by_architecture():
     assert {'pkg2': 'repo'} in [event.in_pkgs for event in filtered]
     assert {'pkg3': 'repo'} not in [event.in_pkgs for event in filtered]
     assert {'pkg4': 'repo'} in [event.in_pkgs for event in filtered]
+
+
+def test_index_events():
+    events = [
+        Event('Removed', {'pkg1': 'repo'}, {}, (7, 6), (8, 0), []),
+        Event('Merged', {'pkg1': 'repo', 'pkg2': 'repo'}, {'pkg3': 'repo'}, (7, 6), (8, 1), []),
+        Event('Present', {'pkg2': 'repo'}, {}, (7, 6), (8, 0), []),
+    ]
+
+    index = index_events(events)
+    assert sorted(index.keys()) == [(8, 0), (8, 1)]
+    assert index[(8, 0)] == {'pkg1': [(0, events[0])], 'pkg2': [(2, events[2])]}
+    assert index[(8, 1)] == {'pkg1': [(1, events[1])], 'pkg2': [(1, events[1])]}
+
+
+def test_get_relevant_release_events():
+    events = [
+        Event('Present', {'pkg3': 'repo'}, {}, (7, 6), (8, 0), []),
+        Event('Merged', {'pkg1': 'repo', 'pkg2': 'repo'}, {'pkg3': 'repo'}, (7, 6), (8, 0), []),
+        Event('Merged', {'pkg1': 'repo', 'pkg4': 'repo'}, {'pkg5': 'repo'}, (7, 6), (8, 0), []),
+        Event('Removed', {'pkg6': 'repo'}, {}, (7, 6), (8, 0), []),
+        Event('Present', {'pkg2': 'repo'}, {}, (7, 6), (8, 0), []),
+    ]
+    tasks = {'to_keep': {}, 'to_install': {'pkg3': 'repo'}, 'to_remove': {}}
+
+    relevant = get_relevant_release_events(index_events(events)[(8, 0)], {'pkg1', 'pkg2'}, tasks)
+    # each event is returned once and in the original order
+    assert relevant == [events[0], events[1], events[4]]
+
+
+def test_get_arch_events_cache(monkeypatch, tmpdir):
+    monkeypatch.setattr(library, 'PES_EVENTS_CACHE_DIR', str(tmpdir.join('cache')))
+    pes_file = str(tmpdir.join('pes-events.json'))
+    shutil.copy('files/tests/sample01.json', pes_file)
+
+    events, pes_hash = get_arch_events(pes_file, 'x86_64', ((7, 6), (8, 1)))
+    assert len(events) == 2
+    assert pes_hash == library._get_file_hash(pes_file)
+    assert os.path.isfile(str(tmpdir.join('cache', 'x86_64.json')))
+
+    def parse_pes_events_file_mocked(path, **dummy_kwargs):
+        raise AssertionError('PES data should be loaded from the cache')
+    monkeypatch.setattr(library, 'parse_pes_events_file', parse_pes_events_file_mocked)
+    assert get_arch_events(pes_file, 'x86_64', ((7, 6), (8, 1))) == (events, pes_hash)
+
+    # the cache is still used when just the modification time changes, and the new one is remembered
+    hashed = []
+    get_file_hash = library._get_file_hash
+    monkeypatch.setattr(library, '_get_file_hash', lambda path: hashed.append(path) or get_file_hash(path))
+    stat = os.stat(pes_file)
+    os.utime(pes_file, (stat.st_atime, stat.st_mtime + 10))
+    assert get_arch_events(pes_file, 'x86_64', ((7, 6), (8, 1))) == (events, pes_hash)
+    assert get_arch_events(pes_file, 'x86_64', ((7, 6), (8, 1))) == (events, pes_hash)
+    assert hashed == [pes_file]
+
+    # the cache is invalidated by the modification of the PES data
+    with open(pes_file, 'a') as f:
+        f.write('\n\n')
+    parsed = []
+    monkeypatch.setattr(library, 'parse_pes_events_file', lambda path, **kwargs: parsed.append(path) or events[:1])
+    assert get_arch_events(pes_file, 'x86_64', ((7, 6), (8, 1)))[0] == events[:1]
+    assert parsed == [pes_file]
+
+    # as well as by the change of the release window
+    assert get_arch_events(pes_file, 'x86_64', ((7, 6), (8, 2)))[0] == events[:1]
+    assert parsed == [pes_file, pes_file]
+
+
+def test_filter_out_transaction_conf_pkgs():
+    tasks = {'to_install': {'install1': 'repo', 'install2': 'repo'},
+             'to_keep': {'keep1': 'repo', 'keep2': 'repo'},
+             'to_remove': {'remove1': 'repo', 'remove2': 'repo', 'remove3': 'repo'}}
+    conf = _transaction_conf(to_install=['remove1'], to_keep=['remove2'], to_remove=['install1', 'keep1'])
+
+    filter_out_transaction_conf_pkgs(tasks, conf)
+
+    assert tasks == {'to_install': {'install2': 'repo'},
+                     'to_keep': {'keep2': 'repo'},
+                     'to_remove': {'remove3': 'repo'}}
+
+
+def test_package_evolution():
+    events = [
+        Event('Renamed', {'a': 'repo'}, {'b': 'repo'}, (7, 6), (8, 0), []),
+        Event('Split', {'b': 'repo'}, {'b': 'repo', 'c': 'repo'}, (8, 0), (8, 1), []),
+        Event('Merged', {'c': 'repo', 'x': 'repo'}, {'d': 'repo'}, (8, 1), (8, 2), []),
+        Event('Removed', {'removed': 'repo'}, {}, (7, 6), (8, 0), []),
+        Event('Present', {'present': 'repo'}, {}, (7, 6), (8, 0), []),
+        Event('Renamed', {'late': 'repo'}, {'later': 'repo'}, (8, 2), (8, 3), []),
+    ]
+
+    graph = build_evolution_graph(events)
+    assert graph == [{'a': {'b'}, 'removed': set(), 'present': {'present'}},
+                     {'b': {'b', 'c'}},
+                     {'c': {'d'}, 'x': {'d'}},
+                     {'late': {'later'}}]
+
+    closure = get_evolution_closure(graph)
+    assert get_package_evolution(closure, 'a') == {'b', 'd'}
+    assert get_package_evolution(closure, 'b') == {'b', 'd'}
+    assert get_package_evolution(closure, 'c') == {'d'}
+    assert get_package_evolution(closure, 'removed') == set()
+    assert get_package_evolution(closure, 'present') == {'present'}
+    assert get_package_evolution(closure, 'late') == {'later'}
+    # packages without events do not change
+    assert get_package_evolution(closure, 'unknown') == {'unknown'}
@@ -0,0 +1,52 @@
+from leapp.libraries.common.config import get_env
+from leapp.libraries.stdlib import api
+from leapp.models import InstalledRedHatSignedRPM, InstalledRPM, InstalledUnsignedRPM
+
+TRUSTED_KEYS_FILE = 'trusted-gpg-keys'
+KEY_ID_PREFIX = 'Key ID '
+
+
+def read_trusted_keys(path):
+    """ Read IDs of trusted GPG keys from the file, one per line, ignoring empty lines and comments """
+    with open(path) as f:
+        lines = (line.split('#', 1)[0].strip().lower() for line in f)
+        return {line for line in lines if line}
+
+
+def get_key_id(pgpsig):
+    """
+    Get ID of the GPG key out of the signature, e.g. '199e2f91fd431d51' for
+    'RSA/SHA256, Mon 01 Jan 1970 00:00:00 AM -03, Key ID 199e2f91fd431d51'
+
+    :return: The key ID, or None if the package is not signed
+    """
+    dummy_head, prefix, key_id = pgpsig.rpartition(KEY_ID_PREFIX)
+    return key_id.strip().lower() if prefix else None
+
+
+def is_signed(pkg, trusted_keys):
+    """ Check whether the package is signed by one of the trusted keys """
+    if get_key_id(pkg.pgpsig) in trusted_keys:
+        return True
+    # "gpg-pubkey" is not signed as it would require another package to verify its signature
+    return pkg.name == 'gpg-pubkey' and pkg.packager.startswith('Red Hat, Inc.')
+
+
+def process():
+    signed_pkgs = InstalledRedHatSignedRPM()
+    unsigned_pkgs = InstalledUnsignedRPM()
+
+    pkgs = [pkg for rpm_pkgs in api.consume(InstalledRPM) for pkg in rpm_pkgs.items]
+    if pkgs:
+        # if we start upgrade with LEAPP_DEVEL_RPMS_ALL_SIGNED=1, we consider all packages to be signed
+        all_signed = get_env('LEAPP_DEVEL_RPMS_ALL_SIGNED', '0') == '1'
+        trusted_keys = read_trusted_keys(api.get_actor_file_path(TRUSTED_KEYS_FILE))
+
+        for pkg in pkgs:
+            if all_signed or is_signed(pkg, trusted_keys):
+                signed_pkgs.items.append(pkg)
+            else:
+                unsigned_pkgs.items.append(pkg)
+
+    api.produce(signed_pkgs)
+    api.produce(unsigned_pkgs)
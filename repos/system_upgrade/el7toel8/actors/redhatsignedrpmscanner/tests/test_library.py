@@ -0,0 +1,73 @@
+import os
+
+from leapp.libraries.actor import library
+from leapp.libraries.common.testutils import produce_mocked
+from leapp.libraries.stdlib import api
+from leapp.models import InstalledRPM, RPM
+
+RH_PACKAGER = 'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>'
+TRUSTED_KEYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'files',
+                                 library.TRUSTED_KEYS_FILE)
+
+
+def _rpm(name, pgpsig, packager=RH_PACKAGER):
+    return RPM(name=name, version='0.1', release='1.sm01', epoch='1', packager=packager, arch='noarch',
+               pgpsig=pgpsig)
+
+
+def test_get_key_id():
+    assert library.get_key_id('RSA/SHA256, Mon 01 Jan 1970 00:00:00 AM -03, Key ID 199E2F91FD431D51') == \
+        '199e2f91fd431d51'
+    assert library.get_key_id('(none)') is None
+
+
+def test_read_trusted_keys(tmpdir):
+    keys_file = tmpdir.join('keys')
+    keys_file.write('# comment\n\n199E2F91FD431D51\n5326810137017186  # other key\n')
+
+    assert library.read_trusted_keys(str(keys_file)) == {'199e2f91fd431d51', '5326810137017186'}
+    assert '199e2f91fd431d51' in library.read_trusted_keys(TRUSTED_KEYS_PATH)
+
+
+def test_is_signed():
+    trusted_keys = {'199e2f91fd431d51'}
+
+    assert library.is_signed(_rpm('sample01', 'RSA/SHA256, Mon 01 Jan 1970, Key ID 199e2f91fd431d51'), trusted_keys)
+    assert not library.is_signed(_rpm('sample02', 'RSA/SHA256, Mon 01 Jan 1970, Key ID 0123456789abcdef'),
+                                 trusted_keys)
+    # key ID of a trusted key in other part of the signature
+    assert not library.is_signed(_rpm('sample03', '199e2f91fd431d51, Key ID 0123456789abcdef'), trusted_keys)
+    assert not library.is_signed(_rpm('sample04', '(none)'), trusted_keys)
+    assert library.is_signed(_rpm('gpg-pubkey', '(none)'), trusted_keys)
+    assert not library.is_signed(_rpm('gpg-pubkey', '(none)', packager='Someone'), trusted_keys)
+
+
+def test_process_signed_unsigned(monkeypatch):
+    pkgs = [_rpm('sample01', 'RSA/SHA256, Mon 01 Jan 1970, Key ID 199e2f91fd431d51'),
+            _rpm('sample02', 'RSA/SHA256, Mon 01 Jan 1970, Key ID 0123456789abcdef')]
+    monkeypatch.setattr(api, 'consume', lambda model: iter([InstalledRPM(items=pkgs)]))
+    monkeypatch.setattr(api, 'produce', produce_mocked())
+    monkeypatch.setattr(api, 'get_actor_file_path', lambda name: TRUSTED_KEYS_PATH)
+    monkeypatch.setattr(library, 'get_env', lambda name, default=None: default)
+
+    library.process()
+
+    signed, unsigned = api.produce.model_instances
+    assert [pkg.name for pkg in signed.items] == ['sample01']
+    assert [pkg.name for pkg in unsigned.items] == ['sample02']
+
+
+def test_process_without_packages(monkeypatch):
+    class CurrentActorMocked(object):
+        configuration = None
+
+    # the environment variables are not needed (nor available when run without configuration) for no packages
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked)
+    monkeypatch.setattr(api, 'consume', lambda model: iter([]))
+    monkeypatch.setattr(api, 'produce', produce_mocked())
+
+    library.process()
+
+    signed, unsigned = api.produce.model_instances
+    assert not signed.items
+    assert not unsigned.items
@@ -1,7 +1,6 @@
 from leapp.actors import Actor
-from leapp.libraries import stdlib
-from leapp.libraries.common.rpms import get_installed_rpms
-from leapp.models import LeftoverPackages, RemovedPackages, RPM
+from leapp.libraries.actor import library
+from leapp.models import LeftoverPackages, RemovedPackages
 from leapp.reporting import Report
 from leapp.tags import RPMUpgradePhaseTag, IPUWorkflowTag, ExperimentalTag
 
@@ -20,33 +19,4 @@ class RemoveLeftoverPackages(Actor):
     tags = (RPMUpgradePhaseTag, IPUWorkflowTag, ExperimentalTag)
 
     def process(self):
-        leftover_packages = next(self.consume(LeftoverPackages), LeftoverPackages())
-        if not leftover_packages.items:
-            self.log.info('No leftover packages, skipping...')
-            return
-
-        installed_rpms = get_installed_rpms()
-
-        to_remove = ['-'.join([pkg.name, pkg.version, pkg.release]) for pkg in leftover_packages.items]
-        cmd = ['dnf', 'remove', '-y', '--noautoremove'] + to_remove
-        try:
-            stdlib.run(cmd)
-        except stdlib.CalledProcessError:
-            error = 'Failed to remove packages: {}'.format(', '.join(to_remove))
-            self.log.error(error)
-            return
-
-        removed_packages = RemovedPackages()
-        removed = list(set(installed_rpms) - set(get_installed_rpms()))
-        for pkg in removed:
-            name, version, release, epoch, packager, arch, pgpsig = pkg.split('|')
-            removed_packages.items.append(RPM(
-                name=name,
-                version=version,
-                epoch=epoch,
-                packager=packager,
-                arch=arch,
-                release=release,
-                pgpsig=pgpsig
-            ))
-        self.produce(removed_packages)
+        library.process()
@@ -0,0 +1,77 @@
+from leapp.libraries import stdlib
+from leapp.libraries.common.rpms import get_installed_rpm_items
+from leapp.libraries.stdlib import api
+from leapp.models import LeftoverPackages, RemovedPackages
+
+
+class PackageRemovalError(Exception):
+    pass
+
+
+def _nvra(pkg):
+    # the epoch is not compared as dnf reports 0 for packages without epoch, while rpm reports '(none)'
+    return (pkg.name, pkg.version, pkg.release, pkg.arch)
+
+
+def remove_packages_dnf(to_remove):
+    """
+    Remove the packages, together with packages depending on them, through the dnf API.
+
+    :return: Set of (name, version, release, arch) of packages removed in the transaction
+    """
+    import dnf  # pylint: disable=import-outside-toplevel
+
+    base = dnf.Base()
+    try:
+        # load /etc/dnf/dnf.conf, otherwise e.g. the configured installonly and protected packages are ignored
+        base.conf.read()
+        base.conf.clean_requirements_on_remove = False
+        base.fill_sack(load_system_repo=True, load_available_repos=False)
+        for pkg_spec in to_remove:
+            base.remove(pkg_spec)
+        base.resolve(allow_erasing=True)
+        base.do_transaction()
+        return {_nvra(pkg) for pkg in base.transaction.remove_set}
+    except dnf.exceptions.Error as e:
+        raise PackageRemovalError(str(e))
+    finally:
+        base.close()
+
+
+def remove_packages(to_remove, installed_rpms):
+    """
+    Remove the packages, together with packages depending on them.
+
+    The removed packages are taken from the dnf transaction. The dnf command is used when the dnf API is not
+    available, the removed packages are found by comparing installed packages before and after the removal then.
+
+    :return: Set of (name, version, release, arch) of removed packages
+    """
+    try:
+        return remove_packages_dnf(to_remove)
+    except ImportError:
+        api.current_logger().debug('The dnf Python API is not available, running the dnf command.')
+
+    try:
+        stdlib.run(['dnf', 'remove', '-y', '--noautoremove'] + to_remove)
+    except stdlib.CalledProcessError as e:
+        raise PackageRemovalError(str(e))
+    still_installed = {_nvra(pkg) for pkg in get_installed_rpm_items()}
+    return {_nvra(pkg) for pkg in installed_rpms} - still_installed
+
+
+def process():
+    leftover_packages = next(api.consume(LeftoverPackages), LeftoverPackages())
+    if not leftover_packages.items:
+        api.current_logger().info('No leftover packages, skipping...')
+        return
+
+    installed_rpms = get_installed_rpm_items()
+    to_remove = ['-'.join([pkg.name, pkg.version, pkg.release]) for pkg in leftover_packages.items]
+    try:
+        removed = remove_packages(to_remove, installed_rpms)
+    except PackageRemovalError:
+        api.current_logger().error('Failed to remove packages: {}'.format(', '.join(to_remove)))
+        return
+
+    api.produce(RemovedPackages(items=[pkg for pkg in installed_rpms if _nvra(pkg) in removed]))
@@ -0,0 +1,135 @@
+import sys
+
+from leapp.libraries.actor import library
+from leapp.libraries.common.testutils import produce_mocked
+from leapp.libraries.stdlib import api, CalledProcessError
+from leapp.models import LeftoverPackages, RPM
+
+RH_PACKAGER = 'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>'
+
+
+def _rpm(name, release='1.el7'):
+    return RPM(name=name, version='0.1', release=release, epoch='(none)', packager=RH_PACKAGER, arch='x86_64',
+               pgpsig='SOME_SIG')
+
+
+INSTALLED = [_rpm('leftover'), _rpm('dependent'), _rpm('bash', '1.el8')]
+
+
+class logger_mocked(object):
+    def __init__(self):
+        self.errmsg = []
+
+    def __call__(self):
+        return self
+
+    def debug(self, *args):
+        pass
+
+    def info(self, *args):
+        pass
+
+    def error(self, *args):
+        self.errmsg.extend(args)
+
+
+def _raise_import_error(*args):
+    raise ImportError('No module named dnf')
+
+
+def _setup(monkeypatch, leftovers):
+    monkeypatch.setattr(api, 'consume', lambda *models: iter([LeftoverPackages(items=leftovers)]))
+    monkeypatch.setattr(api, 'produce', produce_mocked())
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    monkeypatch.setattr(library, 'get_installed_rpm_items', lambda: INSTALLED)
+
+
+def test_no_leftovers(monkeypatch):
+    _setup(monkeypatch, [])
+    library.process()
+    assert not api.produce.called
+
+
+def test_removed_packages_from_transaction(monkeypatch):
+    _setup(monkeypatch, [_rpm('leftover')])
+    requested = []
+
+    def remove_packages_dnf(to_remove):
+        requested.extend(to_remove)
+        return {('leftover', '0.1', '1.el7', 'x86_64'), ('dependent', '0.1', '1.el7', 'x86_64')}
+
+    monkeypatch.setattr(library, 'remove_packages_dnf', remove_packages_dnf)
+    library.process()
+
+    assert requested == ['leftover-0.1-1.el7']
+    assert [pkg.name for pkg in api.produce.model_instances[0].items] == ['leftover', 'dependent']
+
+
+def test_removed_packages_by_cmd(monkeypatch):
+    _setup(monkeypatch, [_rpm('leftover')])
+    commands = []
+    monkeypatch.setattr(library, 'remove_packages_dnf', _raise_import_error)
+    monkeypatch.setattr(library.stdlib, 'run', commands.append)
+    library.process()
+
+    # the package list does not change in the test, so nothing has been removed
+    assert commands == [['dnf', 'remove', '-y', '--noautoremove', 'leftover-0.1-1.el7']]
+    assert api.produce.model_instances[0].items == []
+
+
+def test_removal_failed(monkeypatch):
+    _setup(monkeypatch, [_rpm('leftover')])
+
+    def run_mocked(cmd):
+        raise CalledProcessError('dnf failed', cmd, {'exit_code': 1})
+
+    monkeypatch.setattr(library, 'remove_packages_dnf', _raise_import_error)
+    monkeypatch.setattr(library.stdlib, 'run', run_mocked)
+    library.process()
+
+    assert not api.produce.called
+    assert api.current_logger.errmsg
+
+
+class _DnfConfMocked(object):
+    def __init__(self, calls):
+        self._calls = calls
+
+    def read(self):
+        self._calls.append('read')
+
+
+class _DnfBaseMocked(object):
+    def __init__(self, calls):
+        self.calls = calls
+        self.conf = _DnfConfMocked(calls)
+
+    def fill_sack(self, **kwargs):
+        assert self.conf.clean_requirements_on_remove is False
+        self.calls.append('fill_sack')
+
+    def remove(self, pkg_spec):
+        self.calls.append(('remove', pkg_spec))
+
+    def resolve(self, allow_erasing=False):
+        self.calls.append('resolve')
+
+    def do_transaction(self):
+        self.calls.append('do_transaction')
+        self.transaction = type('Transaction', (object,), {'remove_set': [_rpm('leftover')]})
+
+    def close(self):
+        self.calls.append('close')
+
+
+def test_remove_packages_dnf(monkeypatch):
+    calls = []
+    dnf_mocked = type(sys)('dnf')
+    dnf_mocked.Base = lambda: _DnfBaseMocked(calls)
+    dnf_mocked.exceptions = type(sys)('dnf.exceptions')
+    dnf_mocked.exceptions.Error = Exception
+    monkeypatch.setitem(sys.modules, 'dnf', dnf_mocked)
+
+    assert library.remove_packages_dnf(['leftover-0.1-1.el7']) == {('leftover', '0.1', '1.el7', 'x86_64')}
+    # the dnf configuration has to be loaded before the sack is filled
+    assert calls == ['read', 'fill_sack', ('remove', 'leftover-0.1-1.el7'), 'resolve', 'do_transaction', 'close']
@@ -1,7 +1,6 @@
 from leapp.actors import Actor
-from leapp.libraries.actor.library import get_package_repository_data
-from leapp.libraries.common.rpms import get_installed_rpms
-from leapp.models import InstalledRPM, RPM
+from leapp.libraries.actor.library import get_installed_rpms
+from leapp.models import InstalledRPM
 from leapp.tags import IPUWorkflowTag, FactsPhaseTag
 
 
@@ -10,6 +9,7 @@ class RpmScanner(Actor):
     Provides data about installed RPM Packages.
 
     After collecting data from RPM query, a message with relevant data will be produced.
+    The data are reused from the previous run when the rpmdb has not been changed since then.
     """
 
     name = 'rpm_scanner'
@@ -18,23 +18,4 @@ class RpmScanner(Actor):
     tags = (IPUWorkflowTag, FactsPhaseTag)
 
     def process(self):
-        output = get_installed_rpms()
-        pkg_repos = get_package_repository_data()
-
-        result = InstalledRPM()
-        for entry in output:
-            entry = entry.strip()
-            if not entry:
-                continue
-            name, version, release, epoch, packager, arch, pgpsig = entry.split('|')
-            repository = pkg_repos.get(name, '')
-            result.items.append(RPM(
-                name=name,
-                version=version,
-                epoch=epoch,
-                packager=packager,
-                arch=arch,
-                release=release,
-                pgpsig=pgpsig,
-                repository=repository))
-        self.produce(result)
+        self.produce(InstalledRPM(items=get_installed_rpms()))
@@ -1,8 +1,141 @@
+import os
+
 from leapp.exceptions import StopActorExecutionError
+from leapp.libraries.common import cache
+from leapp.libraries.common.rpms import get_installed_rpm_items
+from leapp.libraries.stdlib import api
+from leapp.models import RPM
+
+YUMDB_PATH = '/var/lib/yum/yumdb'
+RPMDB_PACKAGES_PATH = '/var/lib/rpm/Packages'
+INSTALLED_RPMS_CACHE_PATH = os.path.join(cache.CACHE_DIR, 'installed-rpms.json')
+INSTALLED_RPMS_CACHE_VERSION = 1
+# order of RPM fields in the cache
+RPM_FIELDS = ('name', 'epoch', 'packager', 'version', 'release', 'arch', 'pgpsig', 'repository')
+
+
+def get_rpmdb_fingerprint():
+    """
+    Get a cheap fingerprint of the rpmdb, which changes whenever a package is installed, updated or removed.
+
+    :return: The fingerprint or None when the rpmdb cannot be accessed
+    """
+    try:
+        return cache.get_file_stamp(RPMDB_PACKAGES_PATH)
+    except OSError as e:
+        api.current_logger().debug('Cannot get fingerprint of the rpmdb: {}'.format(e))
+        return None
+
+
+def load_installed_rpms_cache(fingerprint, cache_path=None):
+    """
+    Load installed packages stored by a previous run if the rpmdb has not changed since then.
+
+    :param cache_path: Path to the cache file, INSTALLED_RPMS_CACHE_PATH by default
+    :return: List of RPM models or None when the cache is missing, invalid or outdated
+    """
+    cache_path = cache_path or INSTALLED_RPMS_CACHE_PATH
+    cached = cache.load(cache_path, INSTALLED_RPMS_CACHE_VERSION)
+    if cached is None or cached.get('fingerprint') != fingerprint:
+        return None
+    rows = cached.get('rpms')
+    if not isinstance(rows, list) or any(not isinstance(row, list) or len(row) != len(RPM_FIELDS) for row in rows):
+        api.current_logger().debug('Ignoring invalid cache of installed packages {}'.format(cache_path))
+        return None
+    return [RPM(**dict(zip(RPM_FIELDS, row))) for row in rows]
+
+
+def store_installed_rpms_cache(fingerprint, items, cache_path=None):
+    cache.store(cache_path or INSTALLED_RPMS_CACHE_PATH, {
+        'fingerprint': fingerprint,
+        'rpms': [[getattr(item, field) for field in RPM_FIELDS] for item in items],
+    }, INSTALLED_RPMS_CACHE_VERSION)
+
+
+def get_installed_rpms():
+    """
+    Get installed packages with repositories they have been installed from.
+
+    The packages are reused from the previous run when the rpmdb has not changed since then.
+
+    :return: List of RPM models
+    """
+    fingerprint = get_rpmdb_fingerprint()
+    if fingerprint is not None:
+        items = load_installed_rpms_cache(fingerprint)
+        if items is not None:
+            api.current_logger().debug('The rpmdb has not changed, reusing installed packages of the previous run.')
+            return items
+
+    items = get_installed_rpm_items()
+    pkg_repos = get_package_repository_data(items)
+    for item in items:
+        item.repository = pkg_repos.get(item.name, '')
+    if fingerprint is not None:
+        store_installed_rpms_cache(fingerprint, items)
+    return items
+
+
+def get_package_repository_data(installed_rpms=None):
+    """
+    Return dictionary mapping package name with repository from which it was installed
+
+    When the installed packages are given, the repositories are read directly from the yumdb, with a fallback
+    to the (slow) yum API when the yumdb cannot be read.
+
+    :param installed_rpms: List of installed packages (RPM models)
+    """
+    if installed_rpms is not None:
+        try:
+            return get_package_repository_data_from_yumdb(installed_rpms)
+        except OSError as e:
+            api.current_logger().warning('Cannot read the yumdb, using the yum API instead: {}'.format(e))
+    return get_package_repository_data_from_yum()
+
+
+def read_yumdb(yumdb_path=None):
+    """
+    Read repositories packages have been installed from out of the yumdb.
+
+    Entries of the yumdb are stored in directories named <first letter>/<pkgid>-<name>-<version>-<release>-<arch>,
+    the repository is stored in the from_repo file of the entry.
+
+    :param yumdb_path: Path to the yumdb, YUMDB_PATH by default
+    :return: Dictionary mapping (name, version, release, arch) with the repository
+    """
+    yumdb_path = yumdb_path or YUMDB_PATH
+    pkg_repos = {}
+    for letter in os.listdir(yumdb_path):
+        letter_path = os.path.join(yumdb_path, letter)
+        for entry in os.listdir(letter_path):
+            try:
+                with open(os.path.join(letter_path, entry, 'from_repo')) as f:
+                    repository = f.read().strip()
+            except IOError:
+                # e.g. packages installed by rpm from a local file
+                continue
+            nvra = entry.split('-', 1)[-1].rsplit('-', 3)
+            if len(nvra) == 4 and repository:
+                pkg_repos[tuple(nvra)] = repository
+    return pkg_repos
+
+
+def get_package_repository_data_from_yumdb(installed_rpms, yumdb_path=None):
+    """
+    Return dictionary mapping package name with repository from which it was installed, read from the yumdb
+
+    Packages without a yumdb record are reported as 'installed', the same way as by the yum API. Stale records
+    of packages which are not installed anymore are ignored.
+    """
+    yumdb = read_yumdb(yumdb_path)
+    pkg_repos = {}
+    for pkg in installed_rpms:
+        pkg_repos[pkg.name] = yumdb.get((pkg.name, pkg.version, pkg.release, pkg.arch), 'installed')
+    return pkg_repos
 
 
-def get_package_repository_data():
-    """ Return dictionary mapping package name with repository from which it was installed """
+def get_package_repository_data_from_yum():
+    """ Return dictionary mapping package name with repository from which it was installed, using the yum API """
     # import has to be inside the function to avoid troubles with non-existing
     # module in Python3 (where we do not need this function anymore)
     import yum  # pylint: disable=import-outside-toplevel
@@ -0,0 +1,48 @@
+from leapp.libraries.actor import library
+from leapp.libraries.common import cache
+from leapp.models import RPM
+
+RH_PACKAGER = 'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>'
+
+
+def _rpm(name):
+    return RPM(name=name, version='0.1', release='1.el7', epoch='0', packager=RH_PACKAGER, arch='x86_64',
+               pgpsig='SOME_SIG', repository=None)
+
+
+def test_get_installed_rpms_reuses_unchanged_rpmdb(monkeypatch, tmpdir):
+    rpmdb = tmpdir.join('Packages')
+    rpmdb.write('rpmdb')
+    scans = []
+
+    def get_installed_rpm_items():
+        scans.append(True)
+        return [_rpm('bash'), _rpm('custom')]
+
+    monkeypatch.setattr(library, 'RPMDB_PACKAGES_PATH', str(rpmdb))
+    cache_path = tmpdir.join('cache', 'installed-rpms.json')
+    monkeypatch.setattr(library, 'INSTALLED_RPMS_CACHE_PATH', str(cache_path))
+    monkeypatch.setattr(library, 'get_installed_rpm_items', get_installed_rpm_items)
+    monkeypatch.setattr(library, 'get_package_repository_data', lambda items: {'bash': 'rhel-7-server-rpms'})
+
+    items = library.get_installed_rpms()
+    assert [(item.name, item.repository) for item in items] == [('bash', 'rhel-7-server-rpms'), ('custom', '')]
+    assert len(scans) == 1
+    assert cache_path.check(file=1)
+
+    cached_items = library.get_installed_rpms()
+    assert len(scans) == 1
+    assert [(item.name, item.version, item.repository) for item in cached_items] == [
+        ('bash', '0.1', 'rhel-7-server-rpms'), ('custom', '0.1', '')]
+
+    rpmdb.write('rpmdb with a new package')
+    library.get_installed_rpms()
+    assert len(scans) == 2
+
+
+def test_load_installed_rpms_cache_invalid(tmpdir):
+    cache_path = str(tmpdir.join('installed-rpms.json'))
+    cache.store(cache_path, {'fingerprint': {'size': 1}, 'rpms': [['bash']]}, library.INSTALLED_RPMS_CACHE_VERSION)
+
+    assert library.load_installed_rpms_cache({'size': 2}, cache_path) is None
+    assert library.load_installed_rpms_cache({'size': 1}, cache_path) is None
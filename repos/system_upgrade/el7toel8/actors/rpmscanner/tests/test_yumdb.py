@@ -0,0 +1,58 @@
+import os
+
+from leapp.libraries.actor import library
+from leapp.models import RPM
+
+RH_PACKAGER = 'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>'
+
+
+def _rpm(name, version, release, arch='x86_64'):
+    return RPM(name=name, version=version, release=release, epoch='0', packager=RH_PACKAGER, arch=arch,
+               pgpsig='SOME_SIG')
+
+
+def _add_yumdb_entry(yumdb, nvra, repository=None):
+    entry = os.path.join(yumdb, nvra[0][0], 'a1b2c3d4-{}'.format('-'.join(nvra)))
+    os.makedirs(entry)
+    if repository:
+        with open(os.path.join(entry, 'from_repo'), 'w') as f:
+            f.write(repository)
+
+
+def test_read_yumdb(tmpdir):
+    yumdb = str(tmpdir)
+    _add_yumdb_entry(yumdb, ('bash', '4.2.46', '31.el7', 'x86_64'), 'rhel-7-server-rpms')
+    _add_yumdb_entry(yumdb, ('python-libs', '2.7.5', '80.el7_6', 'x86_64'), 'anaconda/7.6')
+    _add_yumdb_entry(yumdb, ('local-pkg', '1.0', '1', 'noarch'))
+
+    assert library.read_yumdb(yumdb) == {
+        ('bash', '4.2.46', '31.el7', 'x86_64'): 'rhel-7-server-rpms',
+        ('python-libs', '2.7.5', '80.el7_6', 'x86_64'): 'anaconda/7.6',
+    }
+
+
+def test_read_yumdb_default_path(monkeypatch, tmpdir):
+    _add_yumdb_entry(str(tmpdir), ('bash', '4.2.46', '31.el7', 'x86_64'), 'rhel-7-server-rpms')
+    monkeypatch.setattr(library, 'YUMDB_PATH', str(tmpdir))
+
+    assert library.read_yumdb() == {('bash', '4.2.46', '31.el7', 'x86_64'): 'rhel-7-server-rpms'}
+
+
+def test_get_package_repository_data_from_yumdb(tmpdir):
+    yumdb = str(tmpdir)
+    _add_yumdb_entry(yumdb, ('bash', '4.2.46', '31.el7', 'x86_64'), 'rhel-7-server-rpms')
+    # stale record of an older version upgraded outside of yum
+    _add_yumdb_entry(yumdb, ('kernel', '3.10.0', '862.el7', 'x86_64'), 'rhel-7-server-rpms')
+    installed = [_rpm('bash', '4.2.46', '31.el7'), _rpm('kernel', '3.10.0', '957.el7')]
+
+    assert library.get_package_repository_data_from_yumdb(installed, yumdb) == {
+        'bash': 'rhel-7-server-rpms',
+        'kernel': 'installed',
+    }
+
+
+def test_get_package_repository_data_falls_back_to_yum(monkeypatch, tmpdir):
+    monkeypatch.setattr(library, 'YUMDB_PATH', str(tmpdir.join('missing')))
+    monkeypatch.setattr(library, 'get_package_repository_data_from_yum', lambda: {'bash': 'rhel-7-server-rpms'})
+
+    assert library.get_package_repository_data([_rpm('bash', '4.2.46', '31.el7')]) == {'bash': 'rhel-7-server-rpms'}
@@ -8,7 +8,7 @@ class ScanInstalledTargetKernelVersion(Actor):
     """
     Scan for the version of the newly installed kernel
 
-    This actor will query rpm for all kernel packages and reports the first matching el8 kernel RPM version.
+    This actor will query rpm for all kernel packages and reports the version of the newest el8 kernel RPM.
     """
 
     name = 'scan_installed_target_kernel_version'
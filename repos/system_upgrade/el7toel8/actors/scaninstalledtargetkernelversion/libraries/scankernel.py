@@ -1,12 +1,15 @@
-from leapp.libraries import stdlib
+from leapp.libraries.common import rpms
 from leapp.libraries.stdlib import api
 from leapp.models import InstalledTargetKernelVersion
 
 
+def get_kernel_release(kernel):
+    """ Return the kernel release as reported by `uname -r`, e.g. '4.18.0-80.el8.x86_64' """
+    return '{}-{}.{}'.format(kernel.version, kernel.release, kernel.arch)
+
+
 def process():
-    kernels = stdlib.run(["rpm", "-q", "kernel"], split=True)["stdout"]
-    for kernel in kernels:
-        version = kernel.split("-", 1)[1]
-        if "el8" in version:
-            api.produce(InstalledTargetKernelVersion(version=version))
-            break
+    kernels = rpms.sort_packages(rpms.get_installed_rpm_items(name='kernel'))
+    target_kernels = [kernel for kernel in kernels if 'el8' in kernel.release]
+    if target_kernels:
+        api.produce(InstalledTargetKernelVersion(version=get_kernel_release(target_kernels[-1])))
@@ -1,23 +1,27 @@
-from leapp.libraries import stdlib
 from leapp.libraries.actor import scankernel
+from leapp.libraries.common import rpms
 from leapp.libraries.stdlib import api
+from leapp.models import RPM
 
+RH_PACKAGER = 'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>'
 TARGET_KERNEL_VERSION = '1.2.3-4.el8.x86_64'
-TARGET_KERNEL = 'kernel-{}'.format(TARGET_KERNEL_VERSION)
-OLD_KERNEL = 'kernel-0.1.2-3.el7.x86_64'
+TARGET_KERNEL = RPM(name='kernel', version='1.2.3', release='4.el8', epoch='0', packager=RH_PACKAGER,
+                    arch='x86_64', pgpsig='SOME_SIG')
+OLD_KERNEL = RPM(name='kernel', version='0.1.2', release='3.el7', epoch='0', packager=RH_PACKAGER,
+                 arch='x86_64', pgpsig='SOME_SIG')
 
 
-def mocked_run_with_target_kernel(*args, **kwargs):
-    return {'stdout': [TARGET_KERNEL, OLD_KERNEL]}
+def mocked_get_installed_rpm_items_with_target_kernel(*args, **kwargs):
+    return [TARGET_KERNEL, OLD_KERNEL]
 
 
-def mocked_run_without_target_kernel(*args, **kwargs):
-    return {'stdout': [OLD_KERNEL]}
+def mocked_get_installed_rpm_items_without_target_kernel(*args, **kwargs):
+    return [OLD_KERNEL]
 
 
 def test_scaninstalledkernel(monkeypatch):
     result = []
-    monkeypatch.setattr(stdlib, 'run', mocked_run_with_target_kernel)
+    monkeypatch.setattr(rpms, 'get_installed_rpm_items', mocked_get_installed_rpm_items_with_target_kernel)
     monkeypatch.setattr(api, 'produce', result.append)
     scankernel.process()
     assert result and result[0].version == TARGET_KERNEL_VERSION
@@ -25,7 +29,17 @@ def test_scaninstalledkernel(monkeypatch):
 
 def test_scaninstalledkernel_missing(monkeypatch):
     result = []
-    monkeypatch.setattr(stdlib, 'run', mocked_run_without_target_kernel)
+    monkeypatch.setattr(rpms, 'get_installed_rpm_items', mocked_get_installed_rpm_items_without_target_kernel)
     monkeypatch.setattr(api, 'produce', result.append)
     scankernel.process()
     assert not result
+
+
+def test_scaninstalledkernel_newest(monkeypatch):
+    result = []
+    newer_kernel = RPM(name='kernel', version='1.2.3', release='10.el8', epoch='0', packager=RH_PACKAGER,
+                       arch='x86_64', pgpsig='SOME_SIG')
+    monkeypatch.setattr(rpms, 'get_installed_rpm_items', lambda *args, **kwargs: [newer_kernel, TARGET_KERNEL])
+    monkeypatch.setattr(api, 'produce', result.append)
+    scankernel.process()
+    assert len(result) == 1 and result[0].version == '1.2.3-10.el8.x86_64'
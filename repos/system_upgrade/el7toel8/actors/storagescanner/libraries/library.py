@@ -1,13 +1,37 @@
 import os
 import subprocess
 import functools
+import json
+import re
+import threading
+import time
 
 
 from leapp.models import StorageInfo, PartitionEntry, FstabEntry, MountEntry, LsblkEntry, \
-    PvsEntry, VgsEntry, LvdisplayEntry, SystemdMountEntry
+    PvsEntry, VgsEntry, LvdisplayEntry, SystemdMountEntry, StorageProbe, MountInfoEntry, BlockDeviceEntry
 from leapp import reporting
+from leapp.exceptions import StopActorExecutionError
 from leapp.libraries.stdlib import api
 
+# maximal time in seconds a command collecting storage info can run
+PROBE_TIMEOUT = 300
+
+# columns requested from lsblk
+LSBLK_COLUMNS = ('NAME', 'KNAME', 'MAJ:MIN', 'TYPE', 'SIZE', 'RO', 'RM', 'FSTYPE', 'UUID', 'LABEL', 'MOUNTPOINT',
+                 'PKNAME')
+# KEY="value" pairs printed by lsblk --pairs, special characters of values are escaped as \xHH
+LSBLK_PAIR_RE = re.compile(r'([A-Z:_-]+)="((?:[^"\\]|\\.)*)"')
+
+# columns of the LVM report, in the order of the default columns of the pvs, vgs and lvs (lvdisplay -C) commands
+LVM_PV_COLUMNS = ('pv_name', 'vg_name', 'pv_fmt', 'pv_attr', 'pv_size', 'pv_free')
+LVM_VG_COLUMNS = ('vg_name', 'pv_count', 'lv_count', 'snap_count', 'vg_attr', 'vg_size', 'vg_free')
+LVM_LV_COLUMNS = ('lv_name', 'vg_name', 'lv_attr', 'lv_size', 'pool_lv', 'origin', 'data_percent',
+                  'metadata_percent', 'move_pv', 'mirror_log', 'copy_percent', 'convert_lv')
+
+
+class ProbeTimeoutError(Exception):
+    """ Raised when a command collecting storage info does not finish in time """
+
 
 def aslist(f):
     """ Decorator used to convert generator to list """
@@ -22,20 +46,72 @@ def _is_file_readable(path):
     return os.path.isfile(path) and os.access(path, os.R_OK)
 
 
-def _get_cmd_output(cmd, delim, expected_len):
-    """ Verify if command exists and return output """
+def _kill(proc, killed):
+    """ Kill the process if it is still running """
+    if proc.poll() is not None:
+        return
+    killed.set()
+    try:
+        proc.kill()
+    except OSError:
+        # the process has just finished
+        pass
+
+
+def _run_cmd(cmd, timeout=PROBE_TIMEOUT):
+    """
+    Verify if command exists and return its output
+
+    :return: The output or None when the command does not exist or fails
+    :raises ProbeTimeoutError: when the command does not finish in the given number of seconds
+    """
     if not any(os.access(os.path.join(path, cmd[0]), os.X_OK) for path in os.environ['PATH'].split(os.pathsep)):
         api.current_logger().warning("'%s': command not found" % cmd[0])
         return
 
+    # FIXME: Will keep call to subprocess until our stdlib supports "env" parameter
+    # when there is any fd except 0,1,2 open, lvm closes the fd and prints a warning.
+    # In our case /dev/urandom has other fd opened, probably for caching purposes.
+    # the commands are run from concurrent threads, close_fds avoids leaking pipes to the other commands
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, universal_newlines=True, close_fds=True,
+                            env={'LVM_SUPPRESS_FD_WARNINGS': '1', 'PATH': os.environ['PATH']})
+    # the timeout parameter of communicate() is not available on Python 2
+    killed = threading.Event()
+    timer = threading.Timer(timeout, _kill, (proc, killed))
+    timer.start()
     try:
-        # FIXME: Will keep call to subprocess until our stdlib supports "env" parameter
-        # when there is any fd except 0,1,2 open, lvm closes the fd and prints a warning.
-        # In our case /dev/urandom has other fd opened, probably for caching purposes.
-        output = subprocess.check_output(cmd, env={'LVM_SUPPRESS_FD_WARNINGS': '1', 'PATH': os.environ['PATH']})
-
-    except subprocess.CalledProcessError as e:
-        api.current_logger().debug("Command '%s' return non-zero exit status: %s" % (" ".join(cmd), e.returncode))
+        output = proc.communicate()[0]
+    finally:
+        timer.cancel()
+
+    if killed.is_set():
+        raise ProbeTimeoutError("Command '%s' did not finish in %s seconds" % (" ".join(cmd), timeout))
+    if proc.returncode:
+        api.current_logger().debug("Command '%s' return non-zero exit status: %s" % (" ".join(cmd), proc.returncode))
+        return None
+    return output
+
+
+def _get_remaining_timeout(deadline, cmd):
+    """
+    Get the time left to run the command within a probe which has to finish by the deadline
+
+    :raises ProbeTimeoutError: when the deadline has already passed
+    """
+    timeout = deadline - time.time()
+    if timeout <= 0:
+        raise ProbeTimeoutError("Probe running '%s' did not finish in %s seconds" % (" ".join(cmd), PROBE_TIMEOUT))
+    return timeout
+
+
+def _get_cmd_output(cmd, delim, expected_len, timeout=PROBE_TIMEOUT):
+    """
+    Verify if command exists and return output split into lists of values
+
+    :raises ProbeTimeoutError: when the command does not finish in the given number of seconds
+    """
+    output = _run_cmd(cmd, timeout)
+    if output is None:
         return
 
     for entry in output.split('\n'):
@@ -150,25 +226,171 @@ def _get_mount_info(path):
             )
 
 
+def _unescape_mountinfo(value):
+    """ Decode characters escaped by the kernel as octal numbers in /proc/self/mountinfo (e.g. space as \\040) """
+    return re.sub(r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), value)
+
+
 @aslist
-def _get_lsblk_info():
-    """ Collect storage info from lsblk command """
-    for entry in _get_cmd_output(['lsblk', '-r', '--noheadings'], ' ', 7):
-        name, maj_min, rm, size, ro, tp, mountpoint = entry
-        yield LsblkEntry(
-            name=name,
-            maj_min=maj_min,
-            rm=rm,
-            size=size,
-            ro=ro,
-            tp=tp,
-            mountpoint=mountpoint)
+def _get_mountinfo_info(path):
+    """ Collect storage info from /proc/self/mountinfo file """
+    with open(path, 'r') as fp:
+        for line in fp:
+            values = line.split()
+            if not values:
+                continue
+            # the list of optional fields following the mount options is terminated by a single hyphen
+            separator = values.index('-', 6)
+            mount_id, parent_id, maj_min, root, mount, options = values[:6]
+            tp, source, super_options = (values[separator + 1:] + [''] * 3)[:3]
+            yield MountInfoEntry(
+                mount_id=int(mount_id),
+                parent_id=int(parent_id),
+                maj_min=maj_min,
+                root=_unescape_mountinfo(root),
+                mount=_unescape_mountinfo(mount),
+                options=options,
+                propagation=values[6:separator],
+                tp=tp,
+                source=_unescape_mountinfo(source),
+                super_options=super_options)
+
+
+def _lsblk_flag(value):
+    """ Convert value of a flag column of lsblk, which is either a boolean or '0'/'1' in older versions """
+    return value in (True, '1', 'true')
+
+
+def _parse_lsblk_json(output):
+    """
+    Get records of block devices out of lsblk --json output
+
+    Devices are nested in the 'children' lists of their parents. A device built on more devices (e.g. LV on more
+    PVs) is listed under each of them.
+
+    :return: Generator of (device, parent name) tuples, parent name is None for top level devices
+    """
+    stack = [(device, None) for device in reversed(json.loads(output)['blockdevices'])]
+    while stack:
+        device, parent = stack.pop()
+        yield {column: device.get(column.lower()) for column in LSBLK_COLUMNS}, parent
+        stack.extend((child, device.get('name')) for child in reversed(device.get('children', [])))
+
+
+def _unescape_lsblk(value):
+    """
+    Decode bytes escaped by lsblk as \\xHH, consecutive escaped bytes can form a single UTF-8 encoded character
+    """
+    def decode(match):
+        data = bytearray(int(byte, 16) for byte in re.findall(r'\\x([0-9a-fA-F]{2})', match.group(0)))
+        # strings are kept encoded on Python 2
+        return bytes(data) if isinstance(value, bytes) else data.decode('utf-8', 'replace')
+    return re.sub(r'(?:\\x[0-9a-fA-F]{2})+', decode, value)
+
+
+def _parse_lsblk_pairs(output):
+    """
+    Get records of block devices out of lsblk --pairs output
+
+    :return: Generator of (device, parent name) tuples, parent name is None for top level devices
+    """
+    for line in output.splitlines():
+        pairs = LSBLK_PAIR_RE.findall(line)
+        if not pairs:
+            continue
+        device = {}
+        for key, value in pairs:
+            # newer versions of lsblk print MAJ:MIN as MAJ_MIN
+            device[key.replace('_', ':')] = _unescape_lsblk(value)
+        yield device, device.get('PKNAME') or None
+
+
+def _get_lsblk_records():
+    """
+    Collect records of block devices from lsblk command
+
+    The JSON output of lsblk is used when supported (util-linux >= 2.27), the KEY="value" pairs otherwise.
+    Both keep values with spaces intact.
+
+    :return: List of (device, parent name) tuples in the order printed by lsblk, a device built on more devices
+             is listed once for each of them
+    """
+    cmd = ['lsblk', '--bytes', '--output', ','.join(LSBLK_COLUMNS)]
+    # both attempts share the timeout of the probe
+    deadline = time.time() + PROBE_TIMEOUT
+    output = _run_cmd(cmd + ['--json'])
+    if output is not None:
+        try:
+            return list(_parse_lsblk_json(output))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            api.current_logger().debug('Cannot parse JSON output of lsblk: %s' % e)
+    output = _run_cmd(cmd + ['--pairs'], _get_remaining_timeout(deadline, cmd))
+    if output is None:
+        return []
+    return list(_parse_lsblk_pairs(output))
+
+
+def _get_block_devices_info(records):
+    """
+    Get block devices out of lsblk records
+
+    :return: List of BlockDeviceEntry models in the order of the first occurrence of the devices
+    """
+    devices = []
+    parents = {}
+    for record, parent in records:
+        if record['NAME'] not in parents:
+            devices.append(record)
+            parents[record['NAME']] = []
+        if parent and parent not in parents[record['NAME']]:
+            parents[record['NAME']].append(parent)
+
+    return [BlockDeviceEntry(
+        name=record['NAME'],
+        kname=record['KNAME'] or record['NAME'],
+        maj_min=record['MAJ:MIN'],
+        tp=record['TYPE'],
+        size_bytes=int(record['SIZE'] or 0),
+        ro=_lsblk_flag(record['RO']),
+        rm=_lsblk_flag(record['RM']),
+        fstype=record['FSTYPE'] or None,
+        uuid=record['UUID'] or None,
+        label=record['LABEL'] or None,
+        mountpoint=record['MOUNTPOINT'] or None,
+        parents=parents[record['NAME']]) for record in devices]
+
+
+def _format_size(size):
+    """ Format the size in bytes the same way as lsblk does without --bytes, e.g. 39.5G """
+    exp = 0
+    while exp < 60 and size >= 1 << (exp + 10):
+        exp += 10
+    dec, frac = size >> exp, size & ((1 << exp) - 1)
+    if frac:
+        # round to a single decimal digit
+        frac = (frac // (1 << (exp - 10)) + 50) // 100
+        if frac == 10:
+            dec, frac = dec + 1, 0
+    suffix = 'BKMGTPE'[exp // 10]
+    return '%d.%d%s' % (dec, frac, suffix) if frac else '%d%s' % (dec, suffix)
+
+
+def _get_lsblk_info(records):
+    """ Get the flat lsblk entries out of lsblk records, one for each listed device as printed by lsblk -r """
+    return [LsblkEntry(
+        name=record['NAME'],
+        maj_min=record['MAJ:MIN'],
+        rm='1' if _lsblk_flag(record['RM']) else '0',
+        size=_format_size(int(record['SIZE'] or 0)),
+        ro='1' if _lsblk_flag(record['RO']) else '0',
+        tp=record['TYPE'],
+        mountpoint=record['MOUNTPOINT'] or '') for record, dummy_parent in records]
 
 
 @aslist
-def _get_pvs_info():
+def _get_pvs_info(timeout=PROBE_TIMEOUT):
     """ Collect storage info from pvs command """
-    for entry in _get_cmd_output(['pvs', '--noheadings', '--separator', r':'], ':', 6):
+    for entry in _get_cmd_output(['pvs', '--noheadings', '--separator', r':'], ':', 6, timeout):
         pv, vg, fmt, attr, psize, pfree = entry
         yield PvsEntry(
             pv=pv,
@@ -180,9 +402,9 @@ def _get_pvs_info():
 
 
 @aslist
-def _get_vgs_info():
+def _get_vgs_info(timeout=PROBE_TIMEOUT):
     """ Collect storage info from vgs command """
-    for entry in _get_cmd_output(['vgs', '--noheadings', '--separator', r':'], ':', 7):
+    for entry in _get_cmd_output(['vgs', '--noheadings', '--separator', r':'], ':', 7, timeout):
         vg, pv, lv, sn, attr, vsize, vfree = entry
         yield VgsEntry(
             vg=vg,
@@ -195,9 +417,9 @@ def _get_vgs_info():
 
 
 @aslist
-def _get_lvdisplay_info():
+def _get_lvdisplay_info(timeout=PROBE_TIMEOUT):
     """ Collect storage info from lvdisplay command """
-    for entry in _get_cmd_output(['lvdisplay', '-C', '--noheadings', '--separator', r':'], ':', 12):
+    for entry in _get_cmd_output(['lvdisplay', '-C', '--noheadings', '--separator', r':'], ':', 12, timeout):
         lv, vg, attr, lsize, pool, origin, data, meta, move, log, cpy_sync, convert = entry
         yield LvdisplayEntry(
             lv=lv,
@@ -214,6 +436,63 @@ def _get_lvdisplay_info():
             convert=convert)
 
 
+def _get_lvm_report():
+    """
+    Get PVs, VGs and LVs from a single LVM report, so devices are scanned just once
+
+    :return: Dictionary with lists of 'pv', 'vg' and 'lv' records, or None when the report cannot be obtained
+             (e.g. the fullreport command is not supported by the installed LVM)
+    """
+    cmd = ['lvm', 'fullreport', '--reportformat', 'json',
+           '--configreport', 'pv', '-o', ','.join(LVM_PV_COLUMNS),
+           '--configreport', 'vg', '-o', ','.join(LVM_VG_COLUMNS),
+           '--configreport', 'lv', '-o', ','.join(LVM_LV_COLUMNS)]
+    output = _run_cmd(cmd)
+    if output is None:
+        return None
+    try:
+        # the report contains one item per VG (including the one of orphan PVs)
+        report = json.loads(output)['report']
+    except (ValueError, KeyError, TypeError) as e:
+        api.current_logger().debug('Cannot parse the LVM report: %s' % e)
+        return None
+
+    records = {'pv': [], 'vg': [], 'lv': []}
+    for item in report:
+        for key, values in records.items():
+            values.extend(item.get(key, []))
+    return records
+
+
+def _get_lvm_info():
+    """
+    Collect storage info from LVM
+
+    The info is collected from a single LVM report, with a fallback to the pvs, vgs and lvdisplay commands.
+
+    :return: Tuple with lists of PvsEntry, VgsEntry and LvdisplayEntry models
+    """
+    # all the commands share the timeout of the probe
+    deadline = time.time() + PROBE_TIMEOUT
+    records = _get_lvm_report()
+    if records is None:
+        pvs = _get_pvs_info(_get_remaining_timeout(deadline, ['pvs']))
+        vgs = _get_vgs_info(_get_remaining_timeout(deadline, ['vgs']))
+        return pvs, vgs, _get_lvdisplay_info(_get_remaining_timeout(deadline, ['lvdisplay']))
+
+    pvs = [PvsEntry(**dict(zip(('pv', 'vg', 'fmt', 'attr', 'psize', 'pfree'),
+                               [pv.get(column, '') for column in LVM_PV_COLUMNS])))
+           for pv in records['pv']]
+    vgs = [VgsEntry(**dict(zip(('vg', 'pv', 'lv', 'sn', 'attr', 'vsize', 'vfree'),
+                               [vg.get(column, '') for column in LVM_VG_COLUMNS])))
+           for vg in records['vg']]
+    lvdisplay = [LvdisplayEntry(**dict(zip(('lv', 'vg', 'attr', 'lsize', 'pool', 'origin', 'data', 'meta', 'move',
+                                            'log', 'cpy_sync', 'convert'),
+                                           [lv.get(column, '') for column in LVM_LV_COLUMNS])))
+                 for lv in records['lv']]
+    return pvs, vgs, lvdisplay
+
+
 @aslist
 def _get_systemd_mount_info():
     """ Collect storage info from systemd-mount command """
@@ -234,14 +513,68 @@ def _get_systemd_mount_info():
             uuid=uuid)
 
 
+def _run_probe(name, probe, results):
+    """ Run the probe and store its result, timing and error under the given name """
+    start = time.time()
+    error = None
+    entries = None
+    try:
+        entries = probe()
+    except Exception as e:  # pylint: disable=broad-except
+        # re-raised in the main thread
+        error = e
+    results[name] = (entries, StorageProbe(name=name, duration=time.time() - start), error)
+
+
+def _run_probes(probes):
+    """
+    Run the probes concurrently
+
+    The probes spend most of the time waiting for commands scanning devices (e.g. every PV is rescanned by each
+    of the LVM commands), so they are run in threads.
+
+    :param probes: Dictionary mapping names of the probes with functions collecting the info
+    :return: Tuple with a dictionary mapping names of the probes with their results, and a list of StorageProbe
+             models sorted by names of the probes
+    :raises: The exception of a failed probe, e.g. ProbeTimeoutError
+    """
+    results = {}
+    threads = [threading.Thread(target=_run_probe, args=(name, probe, results)) for name, probe in probes.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for name in sorted(results):
+        error = results[name][2]
+        if error:
+            raise error
+    entries = {name: result[0] for name, result in results.items()}
+    return entries, [results[name][1] for name in sorted(results)]
+
+
 def get_storage_info():
     """ Collect multiple info about storage and return it """
+    try:
+        results, probes = _run_probes({
+            'lsblk': _get_lsblk_records,
+            'lvm': _get_lvm_info,
+            'systemdmount': _get_systemd_mount_info,
+        })
+    except ProbeTimeoutError as e:
+        # incomplete info would make the checks of the storage pass silently
+        raise StopActorExecutionError(
+            message='Failed to collect storage info',
+            details={'details': str(e)})
+    pvs, vgs, lvdisplay = results['lvm']
     return StorageInfo(
         partitions=_get_partitions_info('/proc/partitions'),
         fstab=_get_fstab_info('/etc/fstab'),
         mount=_get_mount_info('/proc/mounts'),
-        lsblk=_get_lsblk_info(),
-        pvs=_get_pvs_info(),
-        vgs=_get_vgs_info(),
-        lvdisplay=_get_lvdisplay_info(),
-        systemdmount=_get_systemd_mount_info())
+        mountinfo=_get_mountinfo_info('/proc/self/mountinfo'),
+        lsblk=_get_lsblk_info(results['lsblk']),
+        blockdevices=_get_block_devices_info(results['lsblk']),
+        pvs=pvs,
+        vgs=vgs,
+        lvdisplay=lvdisplay,
+        systemdmount=results['systemdmount'],
+        probes=probes)
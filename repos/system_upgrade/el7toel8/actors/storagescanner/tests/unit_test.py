@@ -1,9 +1,16 @@
+import json
+import subprocess
+import threading
+
+import pytest
+
+from leapp.exceptions import StopActorExecutionError
 from leapp.libraries.actor import library
 from leapp import reporting
 from leapp.libraries.common.testutils import create_report_mocked
 from leapp.libraries.stdlib import api
 from leapp.models import PartitionEntry, FstabEntry, MountEntry, LsblkEntry, PvsEntry, VgsEntry, \
-    LvdisplayEntry, SystemdMountEntry
+    LvdisplayEntry, SystemdMountEntry, MountInfoEntry, BlockDeviceEntry
 
 
 def test_get_partitions_info(monkeypatch):
@@ -245,62 +252,162 @@ def test_get_mount_info(monkeypatch):
     assert expected == library._get_mount_info('tests/files/mounts')
 
 
+def test_get_mountinfo_info():
+    mounts = library._get_mountinfo_info('tests/files/mountinfo')
+
+    assert mounts[0] == MountInfoEntry(
+        mount_id=22, parent_id=1, maj_min='253:0', root='/', mount='/', options='rw,relatime',
+        propagation=['shared:1'], tp='xfs', source='/dev/mapper/rhel-root',
+        super_options='rw,seclabel,attr2,inode64,noquota')
+    assert [(mount.mount_id, mount.parent_id, mount.mount) for mount in mounts[1:3]] == [
+        (23, 22, '/proc'), (40, 22, '/boot')]
+    assert mounts[3].mount == '/mnt/my data'
+    assert mounts[3].source == 'server:/export dir'
+    assert mounts[3].propagation == ['shared:27', 'master:3']
+    assert mounts[3].tp == 'nfs4'
+
+
+LSBLK_JSON = {
+    'blockdevices': [
+        {'name': 'vda', 'kname': 'vda', 'maj:min': '252:0', 'type': 'disk', 'size': '42949672960', 'ro': '0',
+         'rm': '0', 'fstype': None, 'uuid': None, 'label': None, 'mountpoint': None, 'pkname': None,
+         'children': [
+             {'name': 'vda1', 'kname': 'vda1', 'maj:min': '252:1', 'type': 'part', 'size': '1073741824',
+              'ro': '0', 'rm': '0', 'fstype': 'xfs', 'uuid': 'abcd', 'label': None, 'mountpoint': '/boot',
+              'pkname': 'vda'},
+             {'name': 'vda2', 'kname': 'vda2', 'maj:min': '252:2', 'type': 'part', 'size': '41875931136',
+              'ro': '0', 'rm': '0', 'fstype': 'LVM2_member', 'uuid': 'efgh', 'label': None,
+              'mountpoint': None, 'pkname': 'vda',
+              'children': [
+                  {'name': 'rhel-data', 'kname': 'dm-0', 'maj:min': '253:0', 'type': 'lvm',
+                   'size': '21474836480', 'ro': '0', 'rm': '0', 'fstype': 'xfs', 'uuid': 'ijkl',
+                   'label': None, 'mountpoint': '/mnt/my data', 'pkname': 'vda2'}]}]},
+        # newer versions of lsblk use numbers and booleans
+        {'name': 'vdb', 'kname': 'vdb', 'maj:min': '252:16', 'type': 'disk', 'size': 10737418240, 'ro': False,
+         'rm': True, 'fstype': 'LVM2_member', 'uuid': 'mnop', 'label': None, 'mountpoint': None, 'pkname': None,
+         'children': [
+             {'name': 'rhel-data', 'kname': 'dm-0', 'maj:min': '253:0', 'type': 'lvm', 'size': 21474836480,
+              'ro': False, 'rm': False, 'fstype': 'xfs', 'uuid': 'ijkl', 'label': None,
+              'mountpoint': '/mnt/my data', 'pkname': 'vdb'}]},
+    ]
+}
+
+LSBLK_PAIRS = (
+    'NAME="vda" KNAME="vda" MAJ:MIN="252:0" TYPE="disk" SIZE="42949672960" RO="0" RM="0" FSTYPE="" UUID="" '
+    'LABEL="" MOUNTPOINT="" PKNAME=""\n'
+    'NAME="vda1" KNAME="vda1" MAJ:MIN="252:1" TYPE="part" SIZE="1073741824" RO="0" RM="0" FSTYPE="xfs" '
+    'UUID="abcd" LABEL="" MOUNTPOINT="/boot" PKNAME="vda"\n'
+    'NAME="vda2" KNAME="vda2" MAJ:MIN="252:2" TYPE="part" SIZE="41875931136" RO="0" RM="0" '
+    'FSTYPE="LVM2_member" UUID="efgh" LABEL="" MOUNTPOINT="" PKNAME="vda"\n'
+    'NAME="rhel-data" KNAME="dm-0" MAJ:MIN="253:0" TYPE="lvm" SIZE="21474836480" RO="0" RM="0" FSTYPE="xfs" '
+    'UUID="ijkl" LABEL="" MOUNTPOINT="/mnt/my\\x20data" PKNAME="vda2"\n'
+    'NAME="vdb" KNAME="vdb" MAJ_MIN="252:16" TYPE="disk" SIZE="10737418240" RO="0" RM="1" '
+    'FSTYPE="LVM2_member" UUID="mnop" LABEL="" MOUNTPOINT="" PKNAME=""\n'
+    'NAME="rhel-data" KNAME="dm-0" MAJ_MIN="253:0" TYPE="lvm" SIZE="21474836480" RO="0" RM="0" FSTYPE="xfs" '
+    'UUID="ijkl" LABEL="" MOUNTPOINT="/mnt/my\\x20data" PKNAME="vdb"\n'
+)
+
+EXPECTED_BLOCK_DEVICES = [
+    BlockDeviceEntry(name='vda', kname='vda', maj_min='252:0', tp='disk', size_bytes=42949672960, ro=False,
+                     rm=False, fstype=None, uuid=None, label=None, mountpoint=None, parents=[]),
+    BlockDeviceEntry(name='vda1', kname='vda1', maj_min='252:1', tp='part', size_bytes=1073741824, ro=False,
+                     rm=False, fstype='xfs', uuid='abcd', label=None, mountpoint='/boot', parents=['vda']),
+    BlockDeviceEntry(name='vda2', kname='vda2', maj_min='252:2', tp='part', size_bytes=41875931136, ro=False,
+                     rm=False, fstype='LVM2_member', uuid='efgh', label=None, mountpoint=None, parents=['vda']),
+    BlockDeviceEntry(name='rhel-data', kname='dm-0', maj_min='253:0', tp='lvm', size_bytes=21474836480, ro=False,
+                     rm=False, fstype='xfs', uuid='ijkl', label=None, mountpoint='/mnt/my data',
+                     parents=['vda2', 'vdb']),
+    BlockDeviceEntry(name='vdb', kname='vdb', maj_min='252:16', tp='disk', size_bytes=10737418240, ro=False,
+                     rm=True, fstype='LVM2_member', uuid='mnop', label=None, mountpoint=None, parents=[]),
+]
+
+
+def test_get_block_devices_info_json(monkeypatch):
+    commands = []
+
+    def run_cmd_mocked(cmd, timeout=None):
+        commands.append(cmd)
+        return json.dumps(LSBLK_JSON)
+
+    monkeypatch.setattr(library, '_run_cmd', run_cmd_mocked)
+
+    assert library._get_block_devices_info(library._get_lsblk_records()) == EXPECTED_BLOCK_DEVICES
+    assert len(commands) == 1
+    assert commands[0][-1] == '--json'
+    assert '--bytes' in commands[0]
+
+
+def test_get_block_devices_info_pairs(monkeypatch):
+    def run_cmd_mocked(cmd, timeout=None):
+        # --json is not supported by lsblk of util-linux < 2.27
+        return LSBLK_PAIRS if cmd[-1] == '--pairs' else None
+
+    monkeypatch.setattr(library, '_run_cmd', run_cmd_mocked)
+
+    assert library._get_block_devices_info(library._get_lsblk_records()) == EXPECTED_BLOCK_DEVICES
+
+
+def test_get_lsblk_records_shared_timeout(monkeypatch):
+    clock = [1000.0]
+    timeouts = []
+
+    def run_cmd_mocked(cmd, timeout=library.PROBE_TIMEOUT):
+        timeouts.append(timeout)
+        clock[0] += 100
+        return LSBLK_PAIRS if cmd[-1] == '--pairs' else None
+
+    monkeypatch.setattr(library.time, 'time', lambda: clock[0])
+    monkeypatch.setattr(library, '_run_cmd', run_cmd_mocked)
+
+    library._get_lsblk_records()
+    assert timeouts == [library.PROBE_TIMEOUT, library.PROBE_TIMEOUT - 100]
+
+    # the JSON attempt took the whole timeout of the probe
+    clock[0] = 1000.0
+    monkeypatch.setattr(library, 'PROBE_TIMEOUT', 100)
+    with pytest.raises(library.ProbeTimeoutError):
+        library._get_lsblk_records()
+
+
+def test_parse_lsblk_pairs_utf8():
+    output = 'NAME="vda1" LABEL="\\xc3\\xa9t\\xc3\\xa9 data" MOUNTPOINT="/mnt/\\xe2\\x82\\xac\\x20x"\n'
+
+    [(device, parent)] = list(library._parse_lsblk_pairs(output))
+
+    # the values are kept encoded on Python 2
+    device = {key: value.decode('utf-8') if isinstance(value, bytes) else value for key, value in device.items()}
+    assert device == {'NAME': 'vda1', 'LABEL': u'\u00e9t\u00e9 data', 'MOUNTPOINT': u'/mnt/\u20ac x'}
+    assert parent is None
+
+
+def test_format_size():
+    assert library._format_size(0) == '0B'
+    assert library._format_size(512) == '512B'
+    assert library._format_size(1536) == '1.5K'
+    assert library._format_size(42949672960) == '40G'
+    assert library._format_size(42412802048) == '39.5G'
+    # rounded up to the next integer, as lsblk does
+    assert library._format_size(1048575) == '1024K'
+
+
 def test_get_lsblk_info(monkeypatch):
-    def get_cmd_output_mocked(cmd, delim, expected_len):
-        return [
-            ['vda', '252:0', '0', '40G', '0', 'disk', ''],
-            ['vda1', '252:1', '0', '1G', '0', 'part', '/boot'],
-            ['vda2', '252:2', '0', '39G', '0', 'part', ''],
-            ['rhel_ibm--p8--kvm--03--guest--02-root', '253:0', '0', '38G', '0', 'lvm', '/'],
-            ['rhel_ibm--p8--kvm--03--guest--02-swap', '253:1', '0', '1G', '0', 'lvm', '[SWAP]']]
+    monkeypatch.setattr(library, '_run_cmd', lambda cmd, timeout=None: json.dumps(LSBLK_JSON))
 
-    monkeypatch.setattr(library, '_get_cmd_output', get_cmd_output_mocked)
-    expected = [
-        LsblkEntry(
-            name='vda',
-            maj_min='252:0',
-            rm='0',
-            size='40G',
-            ro='0',
-            tp='disk',
-            mountpoint=''),
-        LsblkEntry(
-            name='vda1',
-            maj_min='252:1',
-            rm='0',
-            size='1G',
-            ro='0',
-            tp='part',
-            mountpoint='/boot'),
-        LsblkEntry(
-            name='vda2',
-            maj_min='252:2',
-            rm='0',
-            size='39G',
-            ro='0',
-            tp='part',
-            mountpoint=''),
-        LsblkEntry(
-            name='rhel_ibm--p8--kvm--03--guest--02-root',
-            maj_min='253:0',
-            rm='0',
-            size='38G',
-            ro='0',
-            tp='lvm',
-            mountpoint='/'),
-        LsblkEntry(
-            name='rhel_ibm--p8--kvm--03--guest--02-swap',
-            maj_min='253:1',
-            rm='0',
-            size='1G',
-            ro='0',
-            tp='lvm',
-            mountpoint='[SWAP]')]
-    assert expected == library._get_lsblk_info()
+    # the same as lsblk -r, device built on more devices is listed for each of them
+    assert library._get_lsblk_info(library._get_lsblk_records()) == [
+        LsblkEntry(name='vda', maj_min='252:0', rm='0', size='40G', ro='0', tp='disk', mountpoint=''),
+        LsblkEntry(name='vda1', maj_min='252:1', rm='0', size='1G', ro='0', tp='part', mountpoint='/boot'),
+        LsblkEntry(name='vda2', maj_min='252:2', rm='0', size='39G', ro='0', tp='part', mountpoint=''),
+        LsblkEntry(name='rhel-data', maj_min='253:0', rm='0', size='20G', ro='0', tp='lvm',
+                   mountpoint='/mnt/my data'),
+        LsblkEntry(name='vdb', maj_min='252:16', rm='1', size='10G', ro='0', tp='disk', mountpoint=''),
+        LsblkEntry(name='rhel-data', maj_min='253:0', rm='0', size='20G', ro='0', tp='lvm',
+                   mountpoint='/mnt/my data'),
+    ]
 
 
 def test_get_pvs_info(monkeypatch):
-    def get_cmd_output_mocked(cmd, delim, expected_len):
+    def get_cmd_output_mocked(cmd, delim, expected_len, timeout=None):
         return [
             ['/dev/vda2', 'rhel_ibm-p8-kvm-03-guest-02', 'lvm2', 'a--', '<39.00g', '4.00m']]
 
@@ -317,7 +424,7 @@ def test_get_pvs_info(monkeypatch):
 
 
 def test_get_vgs_info(monkeypatch):
-    def get_cmd_output_mocked(cmd, delim, expected_len):
+    def get_cmd_output_mocked(cmd, delim, expected_len, timeout=None):
         return [
             ['rhel_ibm-p8-kvm-03-guest-02', '1', '2', '0', 'wz--n-', '<39.00g', '4.00m']]
 
@@ -335,7 +442,7 @@ def test_get_vgs_info(monkeypatch):
 
 
 def test_get_lvdisplay_info(monkeypatch):
-    def get_cmd_output_mocked(cmd, delim, expected_len):
+    def get_cmd_output_mocked(cmd, delim, expected_len, timeout=None):
         return [
             ['root', 'rhel_ibm-p8-kvm-03-guest-02', '-wi-ao----', '37.99g', '', '', '', '', '', '', '', ''],
             ['swap', 'rhel_ibm-p8-kvm-03-guest-02', '-wi-ao----', '1.00g', '', '', '', '', '', '', '', '']]
@@ -371,6 +478,85 @@ def test_get_lvdisplay_info(monkeypatch):
     assert expected == library._get_lvdisplay_info()
 
 
+LVM_REPORT = {
+    'report': [
+        {
+            'vg': [{'vg_name': 'rhel', 'pv_count': '1', 'lv_count': '2', 'snap_count': '0', 'vg_attr': 'wz--n-',
+                    'vg_size': '<39.00g', 'vg_free': '4.00m'}],
+            'pv': [{'pv_name': '/dev/vda2', 'vg_name': 'rhel', 'pv_fmt': 'lvm2', 'pv_attr': 'a--',
+                    'pv_size': '<39.00g', 'pv_free': '4.00m'}],
+            'lv': [{'lv_name': 'root', 'vg_name': 'rhel', 'lv_attr': '-wi-ao----', 'lv_size': '37.99g',
+                    'pool_lv': '', 'origin': '', 'data_percent': '', 'metadata_percent': '', 'move_pv': '',
+                    'mirror_log': '', 'copy_percent': '', 'convert_lv': ''}],
+            'pvseg': [],
+            'seg': [],
+        },
+        {
+            'vg': [],
+            'pv': [{'pv_name': '/dev/vdb', 'vg_name': '', 'pv_fmt': 'lvm2', 'pv_attr': '---',
+                    'pv_size': '10.00g', 'pv_free': '10.00g'}],
+            'lv': [],
+        },
+    ]
+}
+
+
+def test_get_lvm_info(monkeypatch):
+    commands = []
+
+    def run_cmd_mocked(cmd, timeout=None):
+        commands.append(cmd)
+        return json.dumps(LVM_REPORT)
+
+    monkeypatch.setattr(library, '_run_cmd', run_cmd_mocked)
+    pvs, vgs, lvdisplay = library._get_lvm_info()
+
+    assert len(commands) == 1
+    assert commands[0][:2] == ['lvm', 'fullreport']
+    assert pvs == [
+        PvsEntry(pv='/dev/vda2', vg='rhel', fmt='lvm2', attr='a--', psize='<39.00g', pfree='4.00m'),
+        PvsEntry(pv='/dev/vdb', vg='', fmt='lvm2', attr='---', psize='10.00g', pfree='10.00g')]
+    assert vgs == [VgsEntry(vg='rhel', pv='1', lv='2', sn='0', attr='wz--n-', vsize='<39.00g', vfree='4.00m')]
+    assert lvdisplay == [
+        LvdisplayEntry(lv='root', vg='rhel', attr='-wi-ao----', lsize='37.99g', pool='', origin='', data='',
+                       meta='', move='', log='', cpy_sync='', convert='')]
+
+
+def test_get_lvm_info_fallback(monkeypatch):
+    commands = []
+
+    def run_cmd_mocked(cmd, timeout=None):
+        commands.append(cmd[0])
+        # fullreport is not supported
+        return None if cmd[0] == 'lvm' else 'pv:vg\n'
+
+    monkeypatch.setattr(library, '_run_cmd', run_cmd_mocked)
+    pvs, vgs, lvdisplay = library._get_lvm_info()
+
+    assert commands == ['lvm', 'pvs', 'vgs', 'lvdisplay']
+    assert [pv.pv for pv in pvs] == ['pv']
+    assert [vg.vg for vg in vgs] == ['pv']
+    assert [lv.lv for lv in lvdisplay] == ['pv']
+
+
+def test_get_lvm_info_fallback_shared_timeout(monkeypatch):
+    clock = [1000.0]
+    timeouts = []
+
+    def run_cmd_mocked(cmd, timeout=library.PROBE_TIMEOUT):
+        timeouts.append(timeout)
+        clock[0] += 120
+        return None if cmd[0] == 'lvm' else 'pv:vg\n'
+
+    monkeypatch.setattr(library.time, 'time', lambda: clock[0])
+    monkeypatch.setattr(library, '_run_cmd', run_cmd_mocked)
+
+    with pytest.raises(library.ProbeTimeoutError):
+        library._get_lvm_info()
+    # the lvdisplay command is not run at all, no time is left for it
+    assert timeouts == [library.PROBE_TIMEOUT, library.PROBE_TIMEOUT - 120, library.PROBE_TIMEOUT - 240]
+
+
 def test_get_systemd_mount_info(monkeypatch):
     def get_cmd_output_mocked(cmd, delim, expected_len):
         return [
@@ -423,3 +609,59 @@ def test_get_systemd_mount_info(monkeypatch):
             label='n/a',
             uuid='c3890bf3-9273-4877-ad1f-68144e1eb858')]
     assert expected == library._get_systemd_mount_info()
+
+
+def test_get_cmd_output_timeout():
+    with pytest.raises(library.ProbeTimeoutError):
+        list(library._get_cmd_output(['sleep', '10'], ' ', 1, timeout=0.1))
+    assert list(library._get_cmd_output(['echo', 'a b'], ' ', 3, timeout=10)) == [['a', 'b', '']]
+
+
+def test_kill_finished_process():
+    proc = subprocess.Popen(['true'])
+    proc.wait()
+    killed = threading.Event()
+
+    library._kill(proc, killed)
+
+    assert not killed.is_set()
+
+
+def test_run_probes():
+    barrier = threading.Event()
+
+    def waiting_probe():
+        # finishes only when the other probe runs at the same time
+        assert barrier.wait(5)
+        return ['waiting']
+
+    def releasing_probe():
+        barrier.set()
+        return ['releasing']
+
+    entries, probes = library._run_probes({'waiting': waiting_probe, 'releasing': releasing_probe})
+
+    assert entries == {'waiting': ['waiting'], 'releasing': ['releasing']}
+    assert [probe.name for probe in probes] == ['releasing', 'waiting']
+    assert all(probe.duration >= 0 for probe in probes)
+
+
+def test_run_probes_error():
+    def failing_probe():
+        raise OSError('lvm failed')
+
+    with pytest.raises(OSError, match='lvm failed'):
+        library._run_probes({'lvm': failing_probe, 'lsblk': lambda: []})
+
+
+def test_get_storage_info_timeout(monkeypatch):
+    def timed_out_probe():
+        raise library.ProbeTimeoutError('timed out')
+
+    # a probe which timed out must not look like a system without any LVM
+    monkeypatch.setattr(library, '_get_lvm_info', timed_out_probe)
+    monkeypatch.setattr(library, '_get_lsblk_records', lambda: [])
+    monkeypatch.setattr(library, '_get_systemd_mount_info', lambda: [])
+
+    with pytest.raises(StopActorExecutionError):
+        library.get_storage_info()
@@ -4,7 +4,7 @@ from leapp.models import Report, TcpWrappersFacts, InstalledRedHatSignedRPM
 from leapp.tags import ChecksPhaseTag, IPUWorkflowTag
 from leapp.libraries.stdlib import api
 from leapp.libraries.actor.library import config_affects_daemons
-from leapp.libraries.common.rpms import create_lookup
+from leapp.libraries.common.rpms import get_installed_package_index
 from leapp.reporting import create_report
 from leapp import reporting
 
@@ -53,8 +53,7 @@ class TcpWrappersCheck(Actor):
                 'Could not check tcp wrappers configuration', details={'details': 'No TcpWrappersFacts found.'}
             )
 
-        # Convert installed packages message to list
-        packages = create_lookup(InstalledRedHatSignedRPM, field='items', key='name')
+        packages = get_installed_package_index(InstalledRedHatSignedRPM).names
 
         found_packages = config_affects_daemons(tcp_wrappers_facts, packages, DAEMONS)
 
@@ -0,0 +1,67 @@
+import os
+from collections import namedtuple
+
+from leapp.libraries.common import rpms
+from leapp.libraries.stdlib import api, run, CalledProcessError
+from leapp.models import RpmTransactionTasks
+
+BUNDLED_RPMS_FOLDER = 'bundled-rpms'
+
+BundledRPM = namedtuple('BundledRPM', ['path', 'name', 'epoch', 'version', 'release', 'arch'])
+
+
+class RPMHeadersError(Exception):
+    pass
+
+
+def read_rpm_headers(paths):
+    """
+    Read name, epoch, version, release and arch of the RPM files, all of them by a single rpm call.
+
+    :return: List of BundledRPM in the same order as the paths
+    :raises RPMHeadersError: when rpm fails or does not print exactly one header for each file
+    """
+    cmd = ['rpm', '-qp', '--nosignature', '--queryformat', r'%{NAME}|%{EPOCH}|%{VERSION}|%{RELEASE}|%{ARCH}\n']
+    try:
+        output = run(cmd + list(paths), split=True)['stdout']
+    except CalledProcessError as e:
+        raise RPMHeadersError(str(e))
+    lines = [line.strip().split('|') for line in output if line.strip()]
+    # the headers are matched with the files by their order, anything unexpected would mix them up
+    if len(lines) != len(paths) or any(len(fields) != len(BundledRPM._fields) - 1 for fields in lines):
+        raise RPMHeadersError('Expected {} headers, rpm printed: {}'.format(len(paths), output))
+    return [BundledRPM(path, *fields) for path, fields in zip(paths, lines)]
+
+
+def select_rpms(bundled_rpms):
+    """
+    Select the newest version of each bundled package, older versions would be just replaced in the transaction.
+
+    Installed packages are not taken into account, as the bundled el8 packages are meant to replace the el7 ones
+    even when those have the same or a newer version.
+    """
+    newest = {}
+    for pkg in bundled_rpms:
+        key = (pkg.name, pkg.arch)
+        if key not in newest or rpms.compare_packages(pkg, newest[key]) > 0:
+            newest[key] = pkg
+    return sorted(newest.values(), key=lambda pkg: pkg.path)
+
+
+def process():
+    location = api.get_folder_path(BUNDLED_RPMS_FOLDER)
+    # It is important to put here the realpath to the files here, because
+    # symlinks cannot be resolved properly inside of the target userspace since they use the /installroot
+    # mount target
+    paths = sorted(os.path.realpath(os.path.join(location, name)) for name in os.listdir(location)
+                   if name.endswith('.rpm'))
+    if not paths:
+        return
+    try:
+        bundled_rpms = read_rpm_headers(paths)
+    except RPMHeadersError as e:
+        # do not miss any bundled RPM because of the optimization
+        api.current_logger().warning('Cannot read headers of bundled RPMs: {}'.format(e))
+        api.produce(RpmTransactionTasks(local_rpms=paths))
+        return
+    api.produce(RpmTransactionTasks(local_rpms=[pkg.path for pkg in select_rpms(bundled_rpms)]))
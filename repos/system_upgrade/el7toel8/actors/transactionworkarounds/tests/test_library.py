@@ -0,0 +1,73 @@
+import pytest
+
+from leapp.libraries.actor import library
+from leapp.libraries.common.testutils import produce_mocked
+from leapp.libraries.stdlib import api
+
+
+class logger_mocked(object):
+    def __init__(self):
+        self.warnmsg = []
+
+    def __call__(self):
+        return self
+
+    def warning(self, *args):
+        self.warnmsg.extend(args)
+
+
+def _bundled(path, name, version, release='1.el8', arch='noarch'):
+    return library.BundledRPM(path, name, '(none)', version, release, arch)
+
+
+def test_read_rpm_headers(monkeypatch):
+    paths = ['/bundled/a-1.0-1.el8.noarch.rpm', '/bundled/b-2.0-1.el8.x86_64.rpm']
+    output = ['a|(none)|1.0|1.el8|noarch', 'b|1|2.0|1.el8|x86_64']
+    monkeypatch.setattr(library, 'run', lambda cmd, split: {'stdout': output})
+
+    assert library.read_rpm_headers(paths) == [_bundled(paths[0], 'a', '1.0'),
+                                               library.BundledRPM(paths[1], 'b', '1', '2.0', '1.el8', 'x86_64')]
+
+
+def test_read_rpm_headers_unexpected_output(monkeypatch):
+    paths = ['/bundled/a-1.0-1.el8.noarch.rpm', '/bundled/broken.rpm', '/bundled/c-1.0-1.el8.noarch.rpm']
+    # no header printed for the broken package
+    output = ['a|(none)|1.0|1.el8|noarch', 'c|(none)|1.0|1.el8|noarch']
+    monkeypatch.setattr(library, 'run', lambda cmd, split: {'stdout': output})
+
+    with pytest.raises(library.RPMHeadersError):
+        library.read_rpm_headers(paths)
+
+
+def test_select_rpms():
+    bundled = [
+        _bundled('/bundled/a-1.0', 'a', '1.0'),
+        _bundled('/bundled/a-1.1', 'a', '1.1'),
+        _bundled('/bundled/b-1.0', 'b', '1.0'),
+        _bundled('/bundled/b-1.0-x86_64', 'b', '1.0', arch='x86_64'),
+        _bundled('/bundled/c-2.0', 'c', '2.0', release='1.el8'),
+        _bundled('/bundled/c-2.0-2', 'c', '2.0', release='2.el8'),
+    ]
+
+    selected = library.select_rpms(bundled)
+
+    assert [pkg.path for pkg in selected] == ['/bundled/a-1.1', '/bundled/b-1.0', '/bundled/b-1.0-x86_64',
+                                              '/bundled/c-2.0-2']
+
+
+def test_process_falls_back_to_all_rpms(monkeypatch, tmpdir):
+    for name in ('a-1.0-1.el8.noarch.rpm', 'a-1.1-1.el8.noarch.rpm'):
+        tmpdir.join(name).write(name)
+
+    def read_rpm_headers(paths):
+        raise library.RPMHeadersError('rpm failed')
+
+    monkeypatch.setattr(api, 'get_folder_path', lambda name: str(tmpdir))
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    monkeypatch.setattr(api, 'produce', produce_mocked())
+    monkeypatch.setattr(library, 'read_rpm_headers', read_rpm_headers)
+
+    library.process()
+
+    assert api.produce.model_instances[0].local_rpms == [str(tmpdir.join('a-1.0-1.el8.noarch.rpm')),
+                                                         str(tmpdir.join('a-1.1-1.el8.noarch.rpm'))]
@@ -15,6 +15,5 @@ class VsftpdConfigRead(Actor):
     tags = (FactsPhaseTag, IPUWorkflowTag)
 
     def process(self):
-        installed_rpm_facts = next(self.consume(InstalledRedHatSignedRPM))
-        if library.is_processable(installed_rpm_facts):
+        if library.is_processable():
             self.produce(library.get_vsftpd_facts())
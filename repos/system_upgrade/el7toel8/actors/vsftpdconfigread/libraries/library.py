@@ -3,8 +3,9 @@ import os
 
 from leapp.libraries.actor import config_parser
 from leapp.libraries.common import vsftpdutils as utils
+from leapp.libraries.common.rpms import has_package
 from leapp.libraries.stdlib import api
-from leapp.models import VsftpdConfig, VsftpdFacts
+from leapp.models import InstalledRedHatSignedRPM, VsftpdConfig, VsftpdFacts
 
 
 def _parse_config(path, content):
@@ -48,8 +49,5 @@ def get_vsftpd_facts(read_func=utils.read_file, listdir=os.listdir):
     return VsftpdFacts(default_config_hash=config_hash, configs=res_configs)
 
 
-def is_processable(installed_rpm_facts):
-    for pkg in installed_rpm_facts.items:
-        if pkg.name == 'vsftpd':
-            return True
-    return False
+def is_processable():
+    return has_package(InstalledRedHatSignedRPM, 'vsftpd')
@@ -3,6 +3,7 @@ import os
 
 from leapp.libraries.actor import library
 from leapp.libraries.common.testutils import make_IOError, make_OSError
+from leapp.libraries.stdlib import api
 from leapp.models import InstalledRedHatSignedRPM, RPM
 
 
@@ -186,7 +187,17 @@ def test_get_vsftpd_facts_inaccessible_dir():
     assert not facts.configs
 
 
-def test_is_processable_vsftpd_installed():
+class CurrentActorMocked(object):
+    def __call__(self):
+        return self
+
+
+def _mock_installed_rpms(monkeypatch, installed_rpms):
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked())
+    monkeypatch.setattr(api, 'consume', lambda model: iter([InstalledRedHatSignedRPM(items=installed_rpms)]))
+
+
+def test_is_processable_vsftpd_installed(monkeypatch):
     installed_rpms = [
         RPM(name='sendmail', version='8.14.7', release='5.el7', epoch='0',
             packager='foo', arch='x86_64', pgpsig='bar'),
@@ -194,21 +205,21 @@ def test_is_processable_vsftpd_installed():
             packager='foo', arch='x86_64', pgpsig='bar'),
         RPM(name='postfix', version='2.10.1', release='7.el7', epoch='0',
             packager='foo', arch='x86_64', pgpsig='bar')]
-    installed_rpm_facts = InstalledRedHatSignedRPM(items=installed_rpms)
+    _mock_installed_rpms(monkeypatch, installed_rpms)
 
-    res = library.is_processable(installed_rpm_facts)
+    res = library.is_processable()
 
     assert res is True
 
 
-def test_is_processable_vsftpd_not_installed():
+def test_is_processable_vsftpd_not_installed(monkeypatch):
     installed_rpms = [
         RPM(name='sendmail', version='8.14.7', release='5.el7', epoch='0',
             packager='foo', arch='x86_64', pgpsig='bar'),
         RPM(name='postfix', version='2.10.1', release='7.el7', epoch='0',
             packager='foo', arch='x86_64', pgpsig='bar')]
-    installed_rpm_facts = InstalledRedHatSignedRPM(items=installed_rpms)
+    _mock_installed_rpms(monkeypatch, installed_rpms)
 
-    res = library.is_processable(installed_rpm_facts)
+    res = library.is_processable()
 
     assert res is False
@@ -1,6 +1,30 @@
+import fcntl
+import os
+import platform
+import struct
+import threading
+
+from leapp.libraries.common.storagetree import StorageTree
 from leapp.libraries.stdlib import api, run
 from leapp.models import StorageInfo, XFSPresence
 
+# struct xfs_fsop_geom_v4 - geometry of the filesystem as returned by kernels older than 5.1, newer kernels still
+# support it under the original ioctl number
+XFS_FSOP_GEOM_SIZE = 112
+XFS_FSOP_GEOM_FLAGS_OFFSET = 92
+XFS_FSOP_GEOM_FLAGS_FTYPE = 0x10000
+
+
+def _ioc_read(ioc_type, number, size):
+    """ Get number of an ioctl reading data from the kernel, the same way as the _IOR macro does """
+    if platform.machine().startswith('ppc'):
+        # the direction is stored in 3 bits and the size in 13 bits on POWER
+        return (2 << 29) | (size << 16) | (ord(ioc_type) << 8) | number
+    return (2 << 30) | (size << 16) | (ord(ioc_type) << 8) | number
+
+
+XFS_IOC_FSGEOMETRY_V4 = _ioc_read('X', 124, XFS_FSOP_GEOM_SIZE)
+
 
 def scan_xfs_fstab(data):
     mountpoints = set()
@@ -11,13 +35,8 @@ def scan_xfs_fstab(data):
     return mountpoints
 
 
-def scan_xfs_mount(data):
-    mountpoints = set()
-    for entry in data:
-        if entry.tp == "xfs":
-            mountpoints.add(entry.mount)
-
-    return mountpoints
+def scan_xfs_mount(tree):
+    return {mount.mount for mount in tree.get_mounts(fs_types=('xfs',))}
 
 
 def scan_xfs_systemdmount(data):
@@ -29,7 +48,30 @@ def scan_xfs_systemdmount(data):
     return mountpoints
 
 
+def has_ftype(mp):
+    """
+    Check whether the XFS filesystem mounted on the mountpoint stores types of files in directory entries
+
+    The geometry of the filesystem is queried directly by the XFS_IOC_FSGEOMETRY ioctl, which is used by xfs_info
+    as well.
+
+    :raises IOError, OSError: when the geometry cannot be queried, e.g. for a mountpoint of another filesystem
+    """
+    fd = os.open(mp, os.O_RDONLY)
+    try:
+        geometry = fcntl.ioctl(fd, XFS_IOC_FSGEOMETRY_V4, b'\0' * XFS_FSOP_GEOM_SIZE)
+    finally:
+        os.close(fd)
+    flags = struct.unpack_from('=I', geometry, XFS_FSOP_GEOM_FLAGS_OFFSET)[0]
+    return bool(flags & XFS_FSOP_GEOM_FLAGS_FTYPE)
+
+
 def is_xfs_without_ftype(mp):
+    try:
+        return not has_ftype(mp)
+    except (IOError, OSError) as e:
+        api.current_logger().debug('Cannot get geometry of {}, using xfs_info: {}'.format(mp, e))
+
     for l in run(['/usr/sbin/xfs_info', '{}'.format(mp)], split=True)['stdout']:
         if 'ftype=0' in l:
             return True
@@ -37,6 +79,50 @@ def is_xfs_without_ftype(mp):
     return False
 
 
+def _check_filesystem(key, mp, results):
+    try:
+        results[key] = (is_xfs_without_ftype(mp), None)
+    except Exception as e:  # pylint: disable=broad-except
+        # re-raised in the main thread
+        results[key] = (None, e)
+
+
+def get_mountpoints_without_ftype(mountpoints, tree):
+    """
+    Get mountpoints of XFS filesystems with ftype = 0
+
+    Each filesystem is checked just once even when it is mounted on more mountpoints (e.g. bind mounts) and the
+    filesystems are checked concurrently.
+
+    :param mountpoints: XFS mountpoints
+    :param tree: StorageTree used to find filesystems mounted on the mountpoints
+    :return: Sorted list of mountpoints
+    """
+    filesystems = {}
+    for mp in sorted(mountpoints):
+        mount = tree.get_mount(mp)
+        # mountpoints which are not mounted (e.g. from fstab) are checked separately
+        key = mount.maj_min if mount and mount.maj_min else mp
+        filesystems.setdefault(key, []).append(mp)
+
+    results = {}
+    threads = [threading.Thread(target=_check_filesystem, args=(key, mps[0], results))
+               for key, mps in filesystems.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    mountpoints_ftype0 = []
+    for key, mps in filesystems.items():
+        without_ftype, error = results[key]
+        if error:
+            raise error
+        if without_ftype:
+            mountpoints_ftype0.extend(mps)
+    return sorted(mountpoints_ftype0)
+
+
 def scan_xfs():
     storage_info_msgs = api.consume(StorageInfo)
     storage_info = next(storage_info_msgs, None)
@@ -47,13 +133,14 @@ def scan_xfs():
     fstab_data = set()
     mount_data = set()
     systemdmount_data = set()
+    tree = StorageTree(storage_info or StorageInfo())
     if storage_info:
         fstab_data = scan_xfs_fstab(storage_info.fstab)
-        mount_data = scan_xfs_mount(storage_info.mount)
+        mount_data = scan_xfs_mount(tree)
         systemdmount_data = scan_xfs_systemdmount(storage_info.systemdmount)
 
     mountpoints = fstab_data | mount_data | systemdmount_data
-    mountpoints_ftype0 = list(filter(is_xfs_without_ftype, mountpoints))
+    mountpoints_ftype0 = get_mountpoints_without_ftype(mountpoints, tree)
 
     # By now, we only have XFS mountpoints and check whether or not it has ftype = 0
     api.produce(XFSPresence(
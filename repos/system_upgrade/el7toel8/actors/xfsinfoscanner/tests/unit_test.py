@@ -1,10 +1,13 @@
+import struct
+
 import pytest
 
 from leapp.exceptions import StopActorExecutionError
 from leapp.libraries.actor import library
+from leapp.libraries.common.storagetree import StorageTree
 from leapp.libraries.common.testutils import produce_mocked
 from leapp.libraries.stdlib import api
-from leapp.models import StorageInfo, FstabEntry, MountEntry, SystemdMountEntry, XFSPresence
+from leapp.models import StorageInfo, FstabEntry, MountEntry, MountInfoEntry, SystemdMountEntry, XFSPresence
 
 
 class run_mocked(object):
@@ -75,7 +78,7 @@ def test_scan_xfs_mount(monkeypatch):
         "tp": "tmpfs",
         "options": "rw,nosuid,nodev,seclabel,mode=755"}
 
-    mountpoints = library.scan_xfs_mount([MountEntry(**mount_data_no_xfs)])
+    mountpoints = library.scan_xfs_mount(StorageTree(StorageInfo(mount=[MountEntry(**mount_data_no_xfs)])))
     assert not mountpoints
 
     mount_data_xfs = {
@@ -84,7 +87,7 @@ def test_scan_xfs_mount(monkeypatch):
         "tp": "xfs",
         "options": "rw,relatime,seclabel,attr2,inode64,noquota"}
 
-    mountpoints = library.scan_xfs_mount([MountEntry(**mount_data_xfs)])
+    mountpoints = library.scan_xfs_mount(StorageTree(StorageInfo(mount=[MountEntry(**mount_data_xfs)])))
     assert mountpoints == {"/boot"}
 
 
@@ -114,8 +117,43 @@ def test_scan_xfs_systemdmount(monkeypatch):
     assert mountpoints == {"/var"}
 
 
+def has_ftype_unsupported(mp):
+    raise IOError(25, 'Inappropriate ioctl for device')
+
+
+def test_has_ftype(monkeypatch):
+    def ioctl_mocked(fd, request, arg):
+        assert request == library.XFS_IOC_FSGEOMETRY_V4
+        assert len(arg) == library.XFS_FSOP_GEOM_SIZE
+        flags = library.XFS_FSOP_GEOM_FLAGS_FTYPE if ftype else 0
+        return arg[:library.XFS_FSOP_GEOM_FLAGS_OFFSET] + struct.pack('=I', flags | 0x8000) + arg[96:]
+
+    monkeypatch.setattr(library.fcntl, "ioctl", ioctl_mocked)
+    ftype = True
+    assert library.has_ftype("/")
+    ftype = False
+    assert not library.has_ftype("/")
+
+
+def test_ioc_read(monkeypatch):
+    monkeypatch.setattr(library.platform, "machine", lambda: "x86_64")
+    assert library._ioc_read('X', 124, 112) == 0x8070587c
+    monkeypatch.setattr(library.platform, "machine", lambda: "ppc64le")
+    assert library._ioc_read('X', 124, 112) == 0x4070587c
+
+
 def test_is_xfs_without_ftype(monkeypatch):
     monkeypatch.setattr(library, "run", run_mocked())
+    monkeypatch.setattr(library, "has_ftype", lambda mp: mp != "/var")
+
+    assert library.is_xfs_without_ftype("/var")
+    assert not library.is_xfs_without_ftype("/boot")
+    assert not library.run.called
+
+
+def test_is_xfs_without_ftype_xfs_info(monkeypatch):
+    monkeypatch.setattr(library, "run", run_mocked())
+    monkeypatch.setattr(library, "has_ftype", has_ftype_unsupported)
 
     assert library.is_xfs_without_ftype("/var")
     assert ' '.join(library.run.args) == "/usr/sbin/xfs_info /var"
@@ -124,8 +162,29 @@ def test_is_xfs_without_ftype(monkeypatch):
     assert ' '.join(library.run.args) == "/usr/sbin/xfs_info /boot"
 
 
+def test_get_mountpoints_without_ftype(monkeypatch):
+    checked = []
+
+    def is_xfs_without_ftype_mocked(mp):
+        checked.append(mp)
+        return mp in ("/var", "/srv")
+
+    def mount(mount_id, mp, maj_min):
+        return MountInfoEntry(mount_id=mount_id, parent_id=1, maj_min=maj_min, root="/", mount=mp,
+                              options="rw", tp="xfs", source="/dev/sda", super_options="rw")
+
+    monkeypatch.setattr(library, "is_xfs_without_ftype", is_xfs_without_ftype_mocked)
+    tree = StorageTree(StorageInfo(mountinfo=[
+        mount(1, "/", "253:0"), mount(2, "/srv", "253:1"), mount(3, "/var", "253:1"), mount(4, "/home", "253:2")]))
+
+    # /var is a bind mount of /srv, /data is not mounted
+    assert library.get_mountpoints_without_ftype({"/", "/var", "/srv", "/home", "/data"}, tree) == ["/srv", "/var"]
+    assert sorted(checked) == ["/", "/data", "/home", "/srv"]
+
+
 def test_scan_xfs(monkeypatch):
     monkeypatch.setattr(library, "run", run_mocked())
+    monkeypatch.setattr(library, "has_ftype", has_ftype_unsupported)
 
     def consume_no_xfs_message_mocked(*models):
         yield StorageInfo()
@@ -0,0 +1,59 @@
+import json
+import os
+
+from leapp.libraries.stdlib import api
+
+CACHE_DIR = '/var/lib/leapp/cache'
+
+
+def get_file_stamp(path):
+    """ Get cheap to obtain attributes of the file which are used to detect its modifications """
+    stat = os.stat(path)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size}
+
+
+def load(cache_path, version):
+    """
+    Load data stored by store.
+
+    :param cache_path: Path to the cache file
+    :param version: Version of the format of the data, cache with other version is ignored
+    :return: A dict with the cached data or None when the cache is missing or invalid
+    """
+    if not os.path.isfile(cache_path):
+        return None
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+        if not isinstance(cache, dict) or cache.get('version') != version:
+            return None
+        return cache
+    except (EnvironmentError, ValueError) as err:
+        api.current_logger().debug('Ignoring invalid cache {}: {}'.format(cache_path, err))
+        return None
+
+
+def store(cache_path, cache, version):
+    """
+    Atomically store the data in the cache file.
+
+    Failure to store the cache is not fatal, the cached data are just computed again next time.
+
+    :param cache_path: Path to the cache file
+    :param cache: A dict with the data, it has to be serializable to JSON
+    :param version: Version of the format of the data
+    """
+    cache = dict(cache, version=version)
+    tmp_path = cache_path + '.tmp'
+    try:
+        if not os.path.isdir(os.path.dirname(cache_path)):
+            os.makedirs(os.path.dirname(cache_path))
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, separators=(',', ':'))
+        os.rename(tmp_path, cache_path)
+    except EnvironmentError as err:
+        api.current_logger().warning('Cannot store cache {}: {}'.format(cache_path, err))
+    finally:
+        # do not leave a partially written cache behind
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
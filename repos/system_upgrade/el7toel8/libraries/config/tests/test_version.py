@@ -12,7 +12,7 @@ class CurrentActorMocked(object):
 
 
 def test_version_to_tuple():
-    assert version._version_to_tuple('7.6') == (7, 6)
+    assert version.version_to_tuple('7.6') == (7, 6)
 
 
 def test_validate_versions():
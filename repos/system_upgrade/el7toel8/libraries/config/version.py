@@ -16,7 +16,7 @@ OP_MAP = {
 SUPPORTED_VERSIONS = {'rhel': ['7.6']}
 
 
-def _version_to_tuple(version):
+def version_to_tuple(version):
     """Converts the version string ``major.minor`` to ``(major, minor)`` int tuple."""
     major, minor = version.split('.')
     return (int(major), int(minor))
@@ -77,12 +77,12 @@ def matches_version(match_list, detected):
         _validate_versions(match_list)
         return detected in match_list
     if _cmp_versions(match_list):
-        detected = _version_to_tuple(detected)
+        detected = version_to_tuple(detected)
         # match_list = ['>= 7.6', '< 7.10']
         _validate_versions([s.split()[1] for s in match_list])
         for match in match_list:
             op, ver = match.split()
-            ver = _version_to_tuple(ver)
+            ver = version_to_tuple(ver)
             if not OP_MAP[op](detected, ver):
                 return False
         return True
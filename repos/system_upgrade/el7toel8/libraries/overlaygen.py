@@ -107,20 +107,23 @@ def cleanup_scratch(scratch_dir, mounts_dir):
 def _create_mount_disk_image(disk_images_directory, path):
     """
     Creates the mount disk image, for cases when we hit XFS with ftype=0
+
+    The image is a sparse file, so it consumes just the disk space actually written to it.
     """
     diskimage_path = os.path.join(disk_images_directory, _mount_name(path))
     disk_size = _overlay_disk_size()
 
     api.current_logger().debug('Attempting to create disk image with size %d MiB at %s', disk_size, diskimage_path)
     utils.call_with_failure_hint(
-        cmd=['/bin/dd', 'if=/dev/zero', 'of={}'.format(diskimage_path), 'bs=1M', 'count={}'.format(disk_size)],
-        hint='Please ensure that there is enough diskspace in {} at least {} MiB are needed'.format(
-            diskimage_path, disk_size)
+        cmd=['/usr/bin/truncate', '--size', '{}M'.format(disk_size), diskimage_path],
+        hint='Please ensure that the disk image {} can be created, the filesystem has to support sparse files '
+             'of {} MiB'.format(diskimage_path, disk_size)
     )
 
     api.current_logger().debug('Creating ext4 filesystem in disk image at %s', diskimage_path)
     try:
-        utils.call_with_oserror_handled(cmd=['/sbin/mkfs.ext4', '-F', diskimage_path])
+        utils.call_with_oserror_handled(
+            cmd=['/sbin/mkfs.ext4', '-F', '-E', 'lazy_itable_init=1,lazy_journal_init=1', diskimage_path])
     except CalledProcessError as e:
         api.current_logger().error('Failed to create ext4 filesystem %s', exc_info=True)
         raise StopActorExecutionError(
@@ -1,23 +1,192 @@
+import functools
+import re
+import weakref
+
 from leapp.libraries import stdlib
-from leapp.models import InstalledRPM
+from leapp.models import InstalledRPM, RPM
+
+# The packager is the only free-form field which can contain the '|' separator, so it has to be the last one
+_INSTALLED_RPMS_QUERYFORMAT = (
+    r'%{NAME}|%{VERSION}|%{RELEASE}|%|EPOCH?{%{EPOCH}}:{(none)}||%|ARCH?{%{ARCH}}:{}||'
+    r'%|DSAHEADER?{%{DSAHEADER:pgpsig}}:{%|RSAHEADER?{%{RSAHEADER:pgpsig}}:{(none)}|}||'
+    r'%|PACKAGER?{%{PACKAGER}}:{(none)}|\n'
+)
+_PGPSIG_QUERYFORMAT = r'%|DSAHEADER?{%{DSAHEADER:pgpsig}}:{%|RSAHEADER?{%{RSAHEADER:pgpsig}}:{(none)}|}|'
+
+
+class RpmdbError(Exception):
+    """Raised when the rpmdb cannot be read through the rpm Python bindings"""
+
+
+def get_installed_rpm_items(name=None):
+    """
+    Get installed packages as RPM models (without the repository they have been installed from).
+
+    The rpmdb is read in-process through the rpm Python bindings when they are available and work, otherwise
+    the output of the rpm command is parsed.
+
+    :param name: When set, only packages with the given name are returned
+    :return: List of RPM models
+    """
+    try:
+        return _get_installed_rpm_items_from_rpmdb(name)
+    except ImportError:
+        stdlib.api.current_logger().debug('The rpm Python bindings are not available, querying the rpm command.')
+    except RpmdbError as err:
+        stdlib.api.current_logger().warning('Cannot read the rpmdb, querying the rpm command: {}'.format(err))
+    return _get_installed_rpm_items_from_rpm_cmd(name)
+
+
+def _to_str(value):
+    """Header values are returned as bytes by the rpm Python 3 bindings"""
+    if isinstance(value, bytes) and not isinstance(value, str):
+        return value.decode('utf-8', 'replace')
+    return value
+
+
+def _get_installed_rpm_items_from_rpmdb(name):
+    import rpm  # pylint: disable=import-outside-toplevel
+
+    items = []
+    try:
+        transaction_set = rpm.TransactionSet()
+        headers = transaction_set.dbMatch('name', name) if name else transaction_set.dbMatch()
+        for header in headers:
+            epoch = header[rpm.RPMTAG_EPOCH]
+            packager = header[rpm.RPMTAG_PACKAGER]
+            items.append(RPM(
+                name=_to_str(header[rpm.RPMTAG_NAME]),
+                version=_to_str(header[rpm.RPMTAG_VERSION]),
+                release=_to_str(header[rpm.RPMTAG_RELEASE]),
+                epoch='(none)' if epoch is None else str(epoch),
+                packager='(none)' if packager is None else _to_str(packager),
+                arch=_to_str(header[rpm.RPMTAG_ARCH] or ''),
+                pgpsig=_to_str(header.format(_PGPSIG_QUERYFORMAT))
+            ))
+    except rpm.error as err:
+        # e.g. the rpmdb is locked or damaged
+        raise RpmdbError(str(err))
+    return items
 
 
-def get_installed_rpms():
-    rpm_cmd = [
-        '/bin/rpm',
-        '-qa',
-        '--queryformat',
-        r'%{NAME}|%{VERSION}|%{RELEASE}|%|EPOCH?{%{EPOCH}}:{(none)}||%|PACKAGER?{%{PACKAGER}}:{(none)}||%|'
-        r'ARCH?{%{ARCH}}:{}||%|DSAHEADER?{%{DSAHEADER:pgpsig}}:{%|RSAHEADER?{%{RSAHEADER:pgpsig}}:{(none)}|}|\n'
-    ]
+def _get_installed_rpm_items_from_rpm_cmd(name):
+    rpm_cmd = ['/bin/rpm', '-q' if name else '-qa', '--queryformat', _INSTALLED_RPMS_QUERYFORMAT]
+    if name:
+        rpm_cmd.append(name)
     try:
-        return stdlib.run(rpm_cmd, split=True)['stdout']
+        output = stdlib.run(rpm_cmd, split=True)['stdout']
     except stdlib.CalledProcessError as err:
-        error = 'Execution of {CMD} returned {RC}. Unable to find installed packages.'.format(CMD=err.command,
-                                                                                              RC=err.exit_code)
-        stdlib.api.current_logger().error(error)
+        # rpm -q returns 1 also when the package is not installed
+        if not name:
+            error = 'Execution of {CMD} returned {RC}. Unable to find installed packages.'.format(CMD=err.command,
+                                                                                                  RC=err.exit_code)
+            stdlib.api.current_logger().error(error)
         return []
 
+    items = []
+    for entry in output:
+        entry = entry.strip()
+        if not entry:
+            continue
+        pkg_name, version, release, epoch, arch, pgpsig, packager = entry.split('|', 6)
+        items.append(RPM(
+            name=pkg_name,
+            version=version,
+            release=release,
+            epoch=epoch,
+            packager=packager,
+            arch=arch,
+            pgpsig=pgpsig
+        ))
+    return items
+
+
+_VERSION_SEPARATOR_RE = re.compile(r'^[^a-zA-Z0-9~^]+')
+_VERSION_SEGMENT_RE = re.compile(r'^([0-9]+|[a-zA-Z]+)')
+
+
+def compare_versions(version1, version2):
+    """
+    Compare two version (or release) strings the same way as rpm does (rpmvercmp).
+
+    :return: 1 if version1 is newer, 0 if they are equal, -1 if version2 is newer
+    """
+    if version1 == version2:
+        return 0
+    while version1 or version2:
+        version1 = _VERSION_SEPARATOR_RE.sub('', version1)
+        version2 = _VERSION_SEPARATOR_RE.sub('', version2)
+
+        # tilde sorts before anything else, even before the end of the version
+        if version1.startswith('~') or version2.startswith('~'):
+            if not version1.startswith('~'):
+                return 1
+            if not version2.startswith('~'):
+                return -1
+            version1, version2 = version1[1:], version2[1:]
+            continue
+
+        # caret sorts after the end of the version, but before anything else
+        if version1.startswith('^') or version2.startswith('^'):
+            if not version1:
+                return -1
+            if not version2:
+                return 1
+            if not version1.startswith('^'):
+                return 1
+            if not version2.startswith('^'):
+                return -1
+            version1, version2 = version1[1:], version2[1:]
+            continue
+
+        if not (version1 and version2):
+            break
+
+        segment1 = _VERSION_SEGMENT_RE.match(version1).group(1)
+        numeric = segment1.isdigit()
+        match = _VERSION_SEGMENT_RE.match(version2)
+        segment2 = match.group(1) if match and match.group(1).isdigit() == numeric else ''
+        if not segment2:
+            # numeric segments are always newer than alpha ones
+            return 1 if numeric else -1
+        version1, version2 = version1[len(segment1):], version2[len(segment2):]
+
+        if numeric:
+            segment1, segment2 = segment1.lstrip('0'), segment2.lstrip('0')
+            if len(segment1) != len(segment2):
+                return 1 if len(segment1) > len(segment2) else -1
+        if segment1 != segment2:
+            return 1 if segment1 > segment2 else -1
+
+    if not version1 and not version2:
+        return 0
+    return 1 if version1 else -1
+
+
+def _epoch_to_int(epoch):
+    try:
+        return int(epoch)
+    except (TypeError, ValueError):
+        # missing epoch, e.g. None or '(none)'
+        return 0
+
+
+def compare_packages(pkg1, pkg2):
+    """
+    Compare epoch, version and release of two packages (RPM models or records with the same fields).
+
+    :return: 1 if pkg1 is newer, 0 if they are equal, -1 if pkg2 is newer
+    """
+    epoch1, epoch2 = _epoch_to_int(pkg1.epoch), _epoch_to_int(pkg2.epoch)
+    if epoch1 != epoch2:
+        return 1 if epoch1 > epoch2 else -1
+    return compare_versions(pkg1.version, pkg2.version) or compare_versions(pkg1.release, pkg2.release)
+
+
+def sort_packages(packages):
+    """ Return the packages sorted from the oldest to the newest one """
+    return sorted(packages, key=functools.cmp_to_key(compare_packages))
+
 
 def create_lookup(model, field, key, context=stdlib.api):
     """
@@ -39,6 +208,58 @@ def create_lookup(model, field, key, context=stdlib.api):
         return {}
 
 
+class InstalledPackageIndex(object):
+    """
+    Index of installed packages for constant time lookups by the package name.
+    """
+
+    def __init__(self, packages=()):
+        self._by_name = {}
+        for pkg in packages:
+            self._by_name.setdefault(pkg.name, []).append(pkg)
+        self._names = frozenset(self._by_name)
+
+    @property
+    def names(self):
+        """ Set of names of the indexed packages """
+        return self._names
+
+    def has_package(self, package_name):
+        return package_name in self._by_name
+
+    def get_packages(self, package_name):
+        """ Return list of packages (RPM models) with the given name, e.g. all installed kernels """
+        return list(self._by_name.get(package_name, ()))
+
+    def __contains__(self, package_name):
+        return self.has_package(package_name)
+
+    def __len__(self):
+        return len(self._by_name)
+
+
+# indexes of installed packages built by actors, {<actor>: {<model>: <InstalledPackageIndex>}}
+_installed_package_indexes = weakref.WeakKeyDictionary()
+
+
+def get_installed_package_index(model, context=stdlib.api):
+    """
+    Get the index of installed packages from the message of the given model.
+
+    The index is built once per actor execution and shared by all callers within the actor, so repeated
+    lookups do not consume and scan the (possibly huge) list of packages again.
+
+    :param model: model class, InstalledRPM or its subclass, e.g. InstalledRedHatSignedRPM
+    :param context: context of the execution
+    """
+    actor = context.current_actor() if hasattr(context, 'current_actor') else None
+    indexes = _installed_package_indexes.setdefault(actor, {}) if actor is not None else {}
+    if model not in indexes:
+        message = next(context.consume(model), None)
+        indexes[model] = InstalledPackageIndex(message.items if message and message.items else ())
+    return indexes[model]
+
+
 def has_package(model, package_name, context=stdlib.api):
     """
     Expects a model InstalledRedHatSignedRPM or InstalledUnsignedRPM.
@@ -50,4 +271,4 @@ def has_package(model, package_name, context=stdlib.api):
     """
     if not (isinstance(model, type) and issubclass(model, InstalledRPM)):
         return False
-    return package_name in create_lookup(model, field='items', key='name', context=context)
+    return get_installed_package_index(model, context=context).has_package(package_name)
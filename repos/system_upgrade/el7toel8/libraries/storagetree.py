@@ -0,0 +1,44 @@
+import os
+
+from leapp.models import MountInfoEntry
+
+
+class StorageTree(object):
+    """
+    Index of mounts reported in the StorageInfo message
+
+    The index is built once from the message, so actors can query mounts without rescanning the flat lists of
+    the message.
+    """
+
+    def __init__(self, storage_info):
+        mounts = storage_info.mountinfo or _get_mountinfo_from_mount(storage_info.mount)
+        self._mounts = mounts
+        # mounts are listed in the order they have been mounted in, so the last mount on a path is the visible one
+        self._mounts_by_path = {mount.mount: mount for mount in mounts}
+
+    def get_mounts(self, fs_types=None):
+        """
+        Get mounts, optionally just the ones with the given filesystem types
+
+        :param fs_types: Collection of filesystem types, e.g. ('nfs', 'nfs4')
+        :return: List of MountInfoEntry models in the order they have been mounted in
+        """
+        if fs_types is None:
+            return list(self._mounts)
+        return [mount for mount in self._mounts if mount.tp in fs_types]
+
+    def get_mount(self, path):
+        """ Get the visible mount on the given mount point or None when nothing is mounted there """
+        return self._mounts_by_path.get(os.path.normpath(path))
+
+
+def _get_mountinfo_from_mount(mount_entries):
+    """
+    Convert entries of /proc/mounts to mountinfo entries, for messages produced without mountinfo
+
+    Information missing in /proc/mounts (IDs, devices) cannot be used for queries of such entries.
+    """
+    return [MountInfoEntry(mount_id=mount_id, parent_id=0, maj_min='', root='/', mount=entry.mount,
+                           options=entry.options, tp=entry.tp, source=entry.name, super_options='')
+            for mount_id, entry in enumerate(mount_entries, 1)]
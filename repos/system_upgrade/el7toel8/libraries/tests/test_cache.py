@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+from leapp.libraries.common import cache
+from leapp.libraries.stdlib import api
+
+
+class logger_mocked(object):
+    def __init__(self):
+        self.debugmsg = []
+        self.warnmsg = []
+
+    def debug(self, msg):
+        self.debugmsg.append(msg)
+
+    def warning(self, msg):
+        self.warnmsg.append(msg)
+
+    def __call__(self):
+        return self
+
+
+def test_store_load_roundtrip(tmpdir):
+    path = str(tmpdir.join('data.json'))
+    cache.store(path, {'items': [1, 2], 'stamp': {'mtime': 1.5}}, 2)
+    assert cache.load(path, 2) == {'items': [1, 2], 'stamp': {'mtime': 1.5}, 'version': 2}
+
+
+def test_load_missing(tmpdir):
+    assert cache.load(str(tmpdir.join('missing.json')), 1) is None
+
+
+def test_load_version_mismatch(tmpdir):
+    path = str(tmpdir.join('data.json'))
+    cache.store(path, {'items': []}, 1)
+    assert cache.load(path, 2) is None
+
+
+@pytest.mark.parametrize('content', ['{"items": [', '[1, 2]'])
+def test_load_corrupt(monkeypatch, tmpdir, content):
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    path = tmpdir.join('data.json')
+    path.write(content)
+    assert cache.load(str(path), 1) is None
+
+
+def test_store_creates_directory(tmpdir):
+    path = str(tmpdir.join('a', 'b', 'data.json'))
+    cache.store(path, {'items': []}, 1)
+    assert cache.load(path, 1) == {'items': [], 'version': 1}
+
+
+def test_store_leaves_no_partial_files(tmpdir):
+    path = str(tmpdir.join('data.json'))
+    cache.store(path, {'items': []}, 1)
+    assert os.listdir(str(tmpdir)) == ['data.json']
+
+    with pytest.raises(TypeError):
+        cache.store(path, {'items': object()}, 2)
+    assert os.listdir(str(tmpdir)) == ['data.json']
+    with open(path) as f:
+        assert json.load(f) == {'items': [], 'version': 1}
+
+
+def test_store_error(monkeypatch, tmpdir):
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    tmpdir.join('file').write('')
+    cache.store(str(tmpdir.join('file', 'data.json')), {'items': []}, 1)
+    assert api.current_logger.warnmsg
+    assert os.listdir(str(tmpdir)) == ['file']
+
+
+def test_get_file_stamp(tmpdir):
+    path = tmpdir.join('file')
+    path.write('abc')
+    stamp = cache.get_file_stamp(str(path))
+    assert stamp == {'mtime': os.stat(str(path)).st_mtime, 'size': 3}
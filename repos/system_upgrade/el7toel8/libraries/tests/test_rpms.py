@@ -0,0 +1,194 @@
+import sys
+import types
+
+from leapp.libraries.common import rpms
+from leapp.libraries.stdlib import api, CalledProcessError
+from leapp.models import InstalledRedHatSignedRPM, InstalledUnsignedRPM, RPM
+
+RPM_OUTPUT = [
+    'kernel|3.10.0|957.el7|(none)|x86_64|RSA/SHA256, Mon 01 Jan 2019, Key ID 199e2f91fd431d51|'
+    'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>',
+    'foo|1.0|1.el7|1|noarch|(none)|Someone | Somewhere <someone@example.com>',
+    '',
+]
+
+
+def _raise_import_error(*args):
+    raise ImportError('No module named rpm')
+
+
+def test_get_installed_rpm_items_from_rpm_cmd(monkeypatch):
+    commands = []
+
+    def mocked_run(cmd, split=False):
+        commands.append(cmd)
+        return {'stdout': RPM_OUTPUT}
+
+    monkeypatch.setattr(rpms, '_get_installed_rpm_items_from_rpmdb', _raise_import_error)
+    monkeypatch.setattr(rpms.stdlib, 'run', mocked_run)
+    items = rpms.get_installed_rpm_items()
+
+    assert commands[0][:2] == ['/bin/rpm', '-qa']
+    assert [item.name for item in items] == ['kernel', 'foo']
+    assert items[0].release == '957.el7'
+    assert items[0].epoch == '(none)'
+    assert items[0].pgpsig.endswith('Key ID 199e2f91fd431d51')
+    assert items[1].epoch == '1'
+    assert items[1].arch == 'noarch'
+    assert items[1].packager == 'Someone | Somewhere <someone@example.com>'
+
+
+def test_get_installed_rpm_items_by_name_not_installed(monkeypatch):
+    commands = []
+
+    def mocked_run(cmd, split=False):
+        commands.append(cmd)
+        raise CalledProcessError('package kernel is not installed', cmd, {'exit_code': 1})
+
+    monkeypatch.setattr(rpms, '_get_installed_rpm_items_from_rpmdb', _raise_import_error)
+    monkeypatch.setattr(rpms.stdlib, 'run', mocked_run)
+
+    assert rpms.get_installed_rpm_items(name='kernel') == []
+    assert commands[0][:2] == ['/bin/rpm', '-q']
+    assert commands[0][-1] == 'kernel'
+
+
+class HeaderMocked(dict):
+    def format(self, queryformat):
+        return self['pgpsig']
+
+
+def _rpm_module_mocked(headers, error=None):
+    rpm = types.ModuleType('rpm')
+    rpm.error = type('error', (Exception,), {})
+    for tag in ('name', 'version', 'release', 'epoch', 'packager', 'arch'):
+        setattr(rpm, 'RPMTAG_{}'.format(tag.upper()), tag)
+
+    class TransactionSet(object):
+        def dbMatch(self, *args):
+            if error:
+                raise rpm.error(error)
+            return [header for header in headers if not args or header['name'] == args[1]]
+
+    rpm.TransactionSet = TransactionSet
+    return rpm
+
+
+def test_get_installed_rpm_items_from_rpmdb(monkeypatch):
+    headers = [
+        HeaderMocked(name=b'kernel', version=b'3.10.0', release=b'957.el7', epoch=None, arch=b'x86_64',
+                     packager=b'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>',
+                     pgpsig=b'RSA/SHA256, Mon 01 Jan 2019, Key ID 199e2f91fd431d51'),
+        HeaderMocked(name='foo', version='1.0', release='1.el7', epoch=1, arch=None, packager=None,
+                     pgpsig='(none)'),
+    ]
+    monkeypatch.setitem(sys.modules, 'rpm', _rpm_module_mocked(headers))
+    monkeypatch.setattr(rpms.stdlib, 'run', _raise_import_error)
+
+    items = rpms.get_installed_rpm_items()
+
+    assert [(item.name, item.epoch, item.arch, item.packager) for item in items] == [
+        ('kernel', '(none)', 'x86_64', 'Red Hat, Inc. <http://bugzilla.redhat.com/bugzilla>'),
+        ('foo', '1', '', '(none)')]
+    assert items[0].pgpsig.endswith('Key ID 199e2f91fd431d51')
+    assert [item.name for item in rpms.get_installed_rpm_items(name='foo')] == ['foo']
+
+
+def test_get_installed_rpm_items_rpmdb_error(monkeypatch):
+    commands = []
+
+    def mocked_run(cmd, split=False):
+        commands.append(cmd)
+        return {'stdout': RPM_OUTPUT}
+
+    monkeypatch.setitem(sys.modules, 'rpm', _rpm_module_mocked([], error='cannot open Packages database'))
+    monkeypatch.setattr(rpms.stdlib, 'run', mocked_run)
+
+    assert [item.name for item in rpms.get_installed_rpm_items()] == ['kernel', 'foo']
+    assert commands[0][:2] == ['/bin/rpm', '-qa']
+
+
+class CurrentActorMocked(object):
+    def __call__(self):
+        return self
+
+
+def _consume_mocked(messages, consumed):
+    def consume(model):
+        consumed.append(model)
+        return iter([msg for msg in messages if isinstance(msg, model)])
+    return consume
+
+
+def _rpm(name, version='1.0', pgpsig='SOME_SIG'):
+    return RPM(name=name, version=version, release='1.el7', epoch='0', packager='foo', arch='x86_64',
+               pgpsig=pgpsig)
+
+
+def test_installed_package_index():
+    index = rpms.InstalledPackageIndex([_rpm('kernel', '1'), _rpm('bash'), _rpm('kernel', '2')])
+
+    assert index.names == {'kernel', 'bash'}
+    assert len(index) == 2
+    assert 'bash' in index
+    assert not index.has_package('zsh')
+    assert [pkg.version for pkg in index.get_packages('kernel')] == ['1', '2']
+    assert index.get_packages('zsh') == []
+
+
+def test_get_installed_package_index_is_shared_within_actor(monkeypatch):
+    consumed = []
+    messages = [InstalledRedHatSignedRPM(items=[_rpm('bash')]), InstalledUnsignedRPM(items=[_rpm('custom')])]
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked())
+    monkeypatch.setattr(api, 'consume', _consume_mocked(messages, consumed))
+
+    assert rpms.has_package(InstalledRedHatSignedRPM, 'bash')
+    assert not rpms.has_package(InstalledRedHatSignedRPM, 'custom')
+    assert rpms.has_package(InstalledUnsignedRPM, 'custom')
+    assert rpms.get_installed_package_index(InstalledRedHatSignedRPM).names == {'bash'}
+    assert consumed == [InstalledRedHatSignedRPM, InstalledUnsignedRPM]
+
+
+def test_get_installed_package_index_without_message(monkeypatch):
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked())
+    monkeypatch.setattr(api, 'consume', _consume_mocked([], []))
+
+    assert not rpms.get_installed_package_index(InstalledRedHatSignedRPM).names
+    assert not rpms.has_package(InstalledRedHatSignedRPM, 'bash')
+
+
+def test_compare_versions():
+    cases = [
+        ('1.0', '1.0', 0),
+        ('1.0', '2.0', -1),
+        ('2.0.1', '2.0', 1),
+        ('1.10', '1.9', 1),
+        ('1.010', '1.10', 0),
+        ('1.0a', '1.0', 1),
+        ('1.0', '1.a', 1),
+        ('957.el7', '1127.el7', -1),
+        ('80.el8', '80.el8_0', -1),
+        ('1.0~rc1', '1.0', -1),
+        ('1.0~rc1', '1.0~rc2', -1),
+        ('1.0^git1', '1.0', 1),
+        ('1.0^git1', '1.0.1', -1),
+        ('1_0', '1.0', 0),
+    ]
+    for version1, version2, result in cases:
+        assert rpms.compare_versions(version1, version2) == result
+        assert rpms.compare_versions(version2, version1) == -result
+
+
+def test_sort_packages():
+    pkgs = [
+        RPM(name='kernel', epoch='0', version='4.18.0', release='80.el8', packager='foo', arch='x86_64',
+            pgpsig='SIG'),
+        RPM(name='kernel', epoch='(none)', version='4.18.0', release='147.el8', packager='foo', arch='x86_64',
+            pgpsig='SIG'),
+        RPM(name='kernel', epoch='0', version='3.10.0', release='1127.el7', packager='foo', arch='x86_64',
+            pgpsig='SIG'),
+        RPM(name='kernel', epoch='1', version='1.0', release='1', packager='foo', arch='x86_64', pgpsig='SIG'),
+    ]
+
+    assert [(pkg.version, pkg.release) for pkg in rpms.sort_packages(pkgs)] == [
+        ('3.10.0', '1127.el7'), ('4.18.0', '80.el8'), ('4.18.0', '147.el8'), ('1.0', '1')]
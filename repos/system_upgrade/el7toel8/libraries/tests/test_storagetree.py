@@ -0,0 +1,43 @@
+from leapp.libraries.common.storagetree import StorageTree
+from leapp.models import MountEntry, MountInfoEntry, StorageInfo
+
+
+def _mount(mount_id, parent_id, mount, tp='xfs', maj_min='253:0'):
+    return MountInfoEntry(mount_id=mount_id, parent_id=parent_id, maj_min=maj_min, root='/', mount=mount,
+                          options='rw', tp=tp, source='/dev/sda', super_options='rw')
+
+
+STORAGE_INFO = StorageInfo(
+    mountinfo=[
+        _mount(1, 1, '/'),
+        _mount(2, 1, '/proc', tp='proc', maj_min='0:4'),
+        _mount(3, 1, '/var', maj_min='252:2'),
+        _mount(4, 3, '/var/lib/nfs', tp='nfs', maj_min='0:40'),
+        _mount(5, 3, '/var', tp='tmpfs', maj_min='0:41'),
+    ])
+
+
+def test_get_mounts():
+    tree = StorageTree(STORAGE_INFO)
+
+    assert [mount.mount_id for mount in tree.get_mounts()] == [1, 2, 3, 4, 5]
+    assert [mount.mount for mount in tree.get_mounts(fs_types=('xfs',))] == ['/', '/var']
+    assert not tree.get_mounts(fs_types=('nfs4',))
+
+
+def test_get_mount():
+    tree = StorageTree(STORAGE_INFO)
+
+    # /var is over-mounted by the tmpfs
+    assert tree.get_mount('/var/').mount_id == 5
+    assert tree.get_mount('/var/lib/nfs').mount_id == 4
+    assert tree.get_mount('/var/log') is None
+
+
+def test_mount_entries_fallback():
+    tree = StorageTree(StorageInfo(mount=[
+        MountEntry(name='/dev/vda1', mount='/boot', tp='xfs', options='rw'),
+        MountEntry(name='server:/share', mount='/mnt', tp='nfs', options='rw')]))
+
+    assert [mount.mount for mount in tree.get_mounts(fs_types=('nfs',))] == ['/mnt']
+    assert tree.get_mount('/boot').source == '/dev/vda1'
@@ -0,0 +1,28 @@
+from leapp.models import Model, fields
+from leapp.topics import SystemInfoTopic
+
+
+class ModifiedConfigFile(Model):
+    """
+    Configuration file which differs from the one shipped in the package, as reported by rpm --verify.
+    """
+    topic = SystemInfoTopic
+
+    path = fields.String()
+    """ Path to the configuration file """
+    flags = fields.String()
+    """ Verification flags reported by rpm, e.g. 'S.5......' (size and digest differ) or 'missing' """
+
+
+class ModifiedConfigFiles(Model):
+    """
+    Modified configuration files of packages other actors are interested in.
+
+    All the packages are verified in a single rpm invocation. Modification times of files are not verified.
+    """
+    topic = SystemInfoTopic
+
+    packages = fields.List(fields.String(), default=[])
+    """ Names of the verified packages """
+    files = fields.List(fields.Model(ModifiedConfigFile), default=[])
+    """ Modified configuration files of the verified packages """
@@ -31,6 +31,49 @@ class MountEntry(Model):
     options = fields.String()
 
 
+class MountInfoEntry(Model):
+    """
+    Mount as described in /proc/self/mountinfo
+    """
+    topic = SystemInfoTopic
+
+    mount_id = fields.Integer()
+    parent_id = fields.Integer()
+    """ ID of the parent mount (or of self for the top of the mount tree) """
+    maj_min = fields.String()
+    """ major:minor of the device the filesystem is on """
+    root = fields.String()
+    """ Root of the mount within the filesystem """
+    mount = fields.String()
+    options = fields.String()
+    propagation = fields.List(fields.String(), default=[])
+    """ Optional fields describing the propagation of mount events, e.g. shared:1 or master:2 """
+    tp = fields.String()
+    source = fields.String()
+    super_options = fields.String()
+
+
+class BlockDeviceEntry(Model):
+    """
+    Block device as reported by lsblk
+    """
+    topic = SystemInfoTopic
+
+    name = fields.String()
+    kname = fields.String()
+    maj_min = fields.String()
+    tp = fields.String()
+    size_bytes = fields.Integer()
+    ro = fields.Boolean()
+    rm = fields.Boolean()
+    fstype = fields.Nullable(fields.String())
+    uuid = fields.Nullable(fields.String())
+    label = fields.Nullable(fields.String())
+    mountpoint = fields.Nullable(fields.String())
+    parents = fields.List(fields.String(), default=[])
+    """ Names of the devices the device is built on, e.g. partition of a disk or LV on PVs """
+
+
 class LsblkEntry(Model):
     topic = SystemInfoTopic
 
@@ -95,6 +138,17 @@ class SystemdMountEntry(Model):
     uuid = fields.String()
 
 
+class StorageProbe(Model):
+    """
+    Information about a run of a command used to collect storage info
+    """
+    topic = SystemInfoTopic
+
+    name = fields.String()
+    duration = fields.Float()
+    """ Duration of the command in seconds """
+
+
 class StorageInfo(Model):
     topic = SystemInfoTopic
     partitions = fields.List(fields.Model(PartitionEntry), default=[])
@@ -105,3 +159,6 @@ class StorageInfo(Model):
     vgs = fields.List(fields.Model(VgsEntry), default=[])
     lvdisplay = fields.List(fields.Model(LvdisplayEntry), default=[])
     systemdmount = fields.List(fields.Model(SystemdMountEntry), default=[])
+    mountinfo = fields.List(fields.Model(MountInfoEntry), default=[])
+    blockdevices = fields.List(fields.Model(BlockDeviceEntry), default=[])
+    probes = fields.List(fields.Model(StorageProbe), default=[])
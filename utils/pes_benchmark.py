@@ -0,0 +1,253 @@
+"""
+Benchmark of the PES events processing in the pes_events_scanner actor on synthetic data.
+
+The script generates a PES data file and a set of installed packages with the requested size and shape, and measures
+time and peak memory of parsing the PES data (parse_pes_events_file) and of processing the events (process_events).
+
+usage: python utils/pes_benchmark.py [--events 30000] [--installed 3000] [--chain-depth 3]
+                                     [--actions Present=50,Removed=10,...] [--arches x86_64,s390x,...]
+                                     [--source 7.6] [--target 8.1] [--repeat 3] [--seed 0] [--keep DIR]
+
+Generated files are removed after the run unless --keep is used to store them in the given directory.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from leapp.repository.scan import find_and_scan_repositories
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2, peak memory is reported just as maximum resident set size of the process
+    tracemalloc = None
+
+
+BASE_REPO = 'repos'
+PES_ACTOR = 'pes_events_scanner'
+DEFAULT_ACTIONS = 'Present=50,Removed=8,Deprecated=4,Replaced=4,Split=6,Merged=4,Moved=16,Renamed=8'
+DEFAULT_ARCHES = 'x86_64,aarch64,ppc64le,s390x'
+REPOSITORIES = ('rhel8-baseos', 'rhel8-appstream', 'rhel8-crb', 'rhel8-highavailability', 'rhel8-supplementary')
+
+
+def get_releases(source, target):
+    """Get releases after the source one up to the target one, assuming 10 minor releases of the source major"""
+    releases = [(source[0], minor) for minor in range(source[1] + 1, 10)]
+    releases += [(major, minor) for major in range(source[0] + 1, target[0]) for minor in range(10)]
+    releases += [(target[0], minor) for minor in range(target[1] + 1)]
+    return releases
+
+
+def parse_actions(actions, event_types):
+    weights = {}
+    for item in actions.split(','):
+        action, weight = item.split('=')
+        if action not in event_types:
+            raise ValueError('Unknown PES action: {}'.format(action))
+        weights[action] = int(weight)
+    return weights
+
+
+class PESDataGenerator(object):
+    """Generator of synthetic PES events and of sets of packages installed on a system"""
+
+    def __init__(self, rng, event_types, releases, action_weights, arches, chain_depth):
+        self.rng = rng
+        self.event_types = event_types
+        self.releases = releases
+        self.actions = list(action_weights.keys())
+        self.weights = [action_weights[action] for action in self.actions]
+        self.arches = arches
+        self.chain_depth = chain_depth
+        self.source_pkgs = []
+        self._pkg_count = 0
+        self._event_count = 0
+
+    def _new_pkg(self):
+        self._pkg_count += 1
+        return 'pkg{}'.format(self._pkg_count)
+
+    def _packageset(self, pkgs, repo=None):
+        return {'set_id': self._event_count,
+                'package': [{'name': pkg, 'repository': repo or self.rng.choice(REPOSITORIES)} for pkg in pkgs]}
+
+    def _release(self, release):
+        return {'major_version': release[0], 'minor_version': release[1], 'z_stream': None, 'tag': None,
+                'os_name': 'RHEL'}
+
+    def _architectures(self):
+        # a third of the events is valid for all architectures
+        if self.rng.random() < 0.33:
+            return []
+        return sorted(self.rng.sample(self.arches, self.rng.randint(1, len(self.arches))))
+
+    def _entry(self, action, in_pkgs, out_pkgs, release_idx):
+        self._event_count += 1
+        return {'id': self._event_count,
+                'action': self.event_types.index(action),
+                'initial_release': self._release(self.releases[release_idx - 1]) if release_idx else None,
+                'release': self._release(self.releases[release_idx]),
+                'in_packageset': self._packageset(in_pkgs, repo='rhel7-base'),
+                'out_packageset': self._packageset(out_pkgs) if out_pkgs else None,
+                'architectures': self._architectures()}
+
+    def _out_pkgs(self, action, in_pkgs):
+        if action in ('Removed',):
+            return []
+        if action in ('Present', 'Deprecated', 'Moved'):
+            return list(in_pkgs)
+        if action == 'Split':
+            return list(in_pkgs[:1]) + [self._new_pkg() for dummy in range(self.rng.randint(1, 3))]
+        return [self._new_pkg()]
+
+    def _chain(self):
+        """Generate a chain of events the package evolves through in the subsequent releases"""
+        depth = self.rng.randint(1, min(self.chain_depth, len(self.releases)))
+        first_release = self.rng.randint(0, len(self.releases) - depth)
+        action = self._weighted_choice()
+        in_pkgs = [self._new_pkg()]
+        if action == 'Merged':
+            in_pkgs.append(self._new_pkg())
+        self.source_pkgs.extend(in_pkgs)
+        entries = []
+        for release_idx in range(first_release, first_release + depth):
+            out_pkgs = self._out_pkgs(action, in_pkgs)
+            entries.append(self._entry(action, in_pkgs, out_pkgs, release_idx))
+            if not out_pkgs:
+                break
+            in_pkgs = out_pkgs[-1:]
+            action = self._weighted_choice()
+        return entries
+
+    def _weighted_choice(self):
+        pick = self.rng.uniform(0, sum(self.weights))
+        for action, weight in zip(self.actions, self.weights):
+            pick -= weight
+            if pick <= 0:
+                return action
+        return self.actions[-1]
+
+    def pes_data(self, event_count):
+        entries = []
+        while len(entries) < event_count:
+            entries.extend(self._chain())
+        return {'packageinfo': entries[:event_count]}
+
+    def installed_pkgs(self, count):
+        """Get names of installed packages, half of them having PES events"""
+        with_events = self.rng.sample(self.source_pkgs, min(count // 2, len(self.source_pkgs)))
+        return set(with_events) | {'other-pkg{}'.format(i) for i in range(count - len(with_events))}
+
+
+def measure(func, repeat):
+    """
+    Call the function repeatedly and measure the best wall time, and the peak memory in one more traced call.
+
+    :return: A tuple with the result of the function, time in seconds and peak memory in KiB
+    """
+    times = []
+    for dummy in range(repeat):
+        gc.collect()
+        start = time.time()
+        result = func()
+        times.append(time.time() - start)
+
+    gc.collect()
+    if tracemalloc:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    else:
+        func()
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result, min(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PES events processing on synthetic data')
+    parser.add_argument('--events', type=int, default=30000, help='number of PES events')
+    parser.add_argument('--installed', type=int, default=3000, help='number of installed packages')
+    parser.add_argument('--chain-depth', type=int, default=3, help='maximal length of chains of events')
+    parser.add_argument('--actions', default=DEFAULT_ACTIONS, help='weights of PES actions')
+    parser.add_argument('--arches', default=DEFAULT_ARCHES, help='architectures used in PES events')
+    parser.add_argument('--arch', default='x86_64', help='architecture of the system')
+    parser.add_argument('--source', default='7.6', help='version of the system')
+    parser.add_argument('--target', default='8.1', help='version the system is upgraded to')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs, the best time is reported')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+    parser.add_argument('--keep', metavar='DIR', help='directory to store the generated data in')
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error('--repeat has to be at least 1')
+
+    repos = find_and_scan_repositories(BASE_REPO, include_locals=True)
+    repos.load()
+    actor = repos.lookup_actor(PES_ACTOR)
+    if not actor:
+        sys.stderr.write('No actor found for search "{}"\n'.format(PES_ACTOR))
+        sys.exit(1)
+
+    with actor.injected_context():
+        # pylint: disable=import-outside-toplevel
+        from leapp.libraries.actor import library
+        from leapp.libraries.common.config.version import version_to_tuple
+
+        try:
+            source, target = version_to_tuple(args.source), version_to_tuple(args.target)
+            action_weights = parse_actions(args.actions, library.EVENT_TYPES)
+        except ValueError as err:
+            parser.error(str(err))
+        arches = args.arches.split(',')
+        generator = PESDataGenerator(random.Random(args.seed), library.EVENT_TYPES, get_releases(source, target),
+                                     action_weights, arches, args.chain_depth)
+        data_dir = args.keep or tempfile.mkdtemp(prefix='pes-benchmark-')
+        if not os.path.isdir(data_dir):
+            os.makedirs(data_dir)
+        pes_file = os.path.join(data_dir, 'pes-events.json')
+        with open(pes_file, 'w') as f:
+            json.dump(generator.pes_data(args.events), f)
+        installed_pkgs = generator.installed_pkgs(args.installed)
+        with open(os.path.join(data_dir, 'installed-pkgs'), 'w') as f:
+            f.write('\n'.join(sorted(installed_pkgs)) + '\n')
+
+        # process_events gets the repositories from messages of the workflow and reports skipped packages,
+        # provide the data directly instead
+        library._get_repositories_mapping = lambda: {repo: repo for repo in REPOSITORIES}
+        library.get_repositories_blacklisted = set
+        library.report_skipped_packages = lambda message, packages: None
+
+        results = []
+        try:
+            release_window = (source, target)
+            events, seconds, peak = measure(
+                lambda: library.parse_pes_events_file(pes_file, arch=args.arch, release_window=release_window),
+                args.repeat)
+            results.append(('parse_pes_events_file', seconds, peak))
+            tasks, seconds, peak = measure(lambda: library.process_events(events, installed_pkgs), args.repeat)
+            results.append(('process_events', seconds, peak))
+        finally:
+            if not args.keep:
+                shutil.rmtree(data_dir)
+
+    sys.stdout.write('PES data: {} events ({} for {} within {} - {}), {} installed packages\n'.format(
+        args.events, len(events), args.arch, args.source, args.target, len(installed_pkgs)))
+    sys.stdout.write('Tasks: {} to install, {} to keep, {} to remove\n'.format(
+        len(tasks['to_install']), len(tasks['to_keep']), len(tasks['to_remove'])))
+    sys.stdout.write('{:<28}{:>12}{:>18}\n'.format('step', 'time [s]', 'peak memory [KiB]'))
+    for step, seconds, peak in results:
+        sys.stdout.write('{:<28}{:>12.3f}{:>18}\n'.format(step, seconds, peak))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, filename='/dev/null')
+    main()
@@ -0,0 +1,106 @@
+"""
+Evaluate PES events for many systems at once, without running the upgrade workflow on them.
+
+The PES data are parsed and indexed only once and shared for all the systems. Each file with installed packages
+is expected to contain names of the installed Red Hat-signed packages of one system, one per line, e.g. as
+exported by:
+
+    rpm -qa --queryformat '%{NAME}\\n'
+
+The name of the file (without the directory) is used as the name of the system. Results are printed to stdout
+in JSON format.
+
+With --evolution, names of the packages the given packages finally evolve into are printed instead.
+
+usage: python utils/pes_fleet_evaluate.py --pes-events pes-events.json --source 7.6 --target 8.1
+                                          --repomap repomap.csv [--arch x86_64] [--blacklist REPOID ...]
+                                          INSTALLED_PKGS_FILE ...
+       python utils/pes_fleet_evaluate.py --pes-events pes-events.json --source 7.6 --target 8.1
+                                          [--arch x86_64] --evolution PKG ...
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+
+from leapp.repository.scan import find_and_scan_repositories
+
+
+BASE_REPO = 'repos'
+PES_ACTOR = 'pes_events_scanner'
+
+
+def read_repositories_mapping(path, arch):
+    """Read the repomap CSV file and map PES repositories to RHSM repository ids for the given architecture"""
+    repositories_mapping = {}
+    with open(path) as f:
+        data = csv.reader(f)
+        next(data)  # skip header
+        for row in data:
+            # skip empty lines and comments
+            if not row or row[0].startswith('#'):
+                continue
+            _from_repoid, to_repoid, to_pes_repo, _from_minor, _to_minor, repo_arch, _repo_type = row
+            if repo_arch == arch:
+                repositories_mapping[to_pes_repo] = to_repoid
+    return repositories_mapping
+
+
+def read_installed_pkgs(path):
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate PES events for many systems at once')
+    parser.add_argument('--pes-events', required=True, help='path to the pes-events.json file')
+    parser.add_argument('--source', required=True, help='version of the systems, e.g. 7.6')
+    parser.add_argument('--target', required=True, help='version the systems are upgraded to, e.g. 8.1')
+    parser.add_argument('--repomap', help='path to the repomap.csv file')
+    parser.add_argument('--arch', default='x86_64', help='architecture of the systems')
+    parser.add_argument('--blacklist', nargs='*', default=[], help='blacklisted RHSM repository ids')
+    parser.add_argument('--evolution', nargs='+', metavar='PKG', help='print what the packages will become')
+    parser.add_argument('installed_pkgs', nargs='*', help='files with names of installed packages')
+    args = parser.parse_args()
+    if not args.evolution and not (args.repomap and args.installed_pkgs):
+        parser.error('--repomap and files with installed packages are required unless --evolution is used')
+
+    repos = find_and_scan_repositories(BASE_REPO, include_locals=True)
+    repos.load()
+    actor = repos.lookup_actor(PES_ACTOR)
+    if not actor:
+        sys.stderr.write('No actor found for search "{}"\n'.format(PES_ACTOR))
+        sys.exit(1)
+
+    with actor.injected_context():
+        # pylint: disable=import-outside-toplevel
+        from leapp.libraries.actor import library
+        from leapp.libraries.common.config.version import version_to_tuple
+
+        try:
+            release_window = (version_to_tuple(args.source), version_to_tuple(args.target))
+            events = library.parse_pes_events_file(args.pes_events, arch=args.arch, release_window=release_window)
+        except (ValueError, KeyError) as err:
+            sys.stderr.write('Invalid PES data file {}: {}\n'.format(args.pes_events, err))
+            sys.exit(1)
+        if args.evolution:
+            closure = library.get_evolution_closure(library.build_evolution_graph(events))
+            results = {pkg: sorted(library.get_package_evolution(closure, pkg)) for pkg in args.evolution}
+        else:
+            repositories_mapping = read_repositories_mapping(args.repomap, args.arch)
+            hosts = {os.path.basename(path): read_installed_pkgs(path) for path in args.installed_pkgs}
+            results = library.process_events_for_hosts(events, hosts, repositories_mapping, args.blacklist)
+            for tasks in results.values():
+                for key in ('to_install', 'to_keep', 'to_remove'):
+                    tasks[key] = sorted(tasks[key])
+
+    json.dump(results, sys.stdout, indent=4, sort_keys=True)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, filename='/dev/null')
+    main()